@@ -1,34 +1,30 @@
-import json
 import random
+import time
+import uuid
+from collections import deque
+import numpy as np
 import streamlit as st
 import streamlit.components.v1 as components
+from client_filter import client_filter_html
+from decomposition_graph import DOWN
+from query_engine import (
+    DATA_FILE, EXPORT_FORMATS, QueryEngine, export_lines, export_rows, format_char_card,
+    format_position, freeze, parse_component_query, phrase_length,
+)
+from instrumentation import RerunTimings, profile_call
+from live_data import LiveData, Snapshot
+from prefetch import Prefetcher
+from result_cache import ResultCache
 
 # Set page configuration
 st.set_page_config(layout="wide")
 
-# Global IDC characters
-IDC_CHARS = {'⿰', '⿱', '⿲', '⿳', '⿴', '⿵', '⿶', '⿷', '⿸', '⿹', '⿺', '⿻'}
-
 # Dynamic CSS with font scaling
-def apply_dynamic_css():
-    font_scale = st.session_state.get('font_scale', 1.0)
-    css = f"""
-    <style>
-        .selected-card {{
-            background-color: #e8f4f8;
-            padding: 15px;
-            border-radius: 10px;
-            margin-bottom: 20px;
-            box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-            display: flex;
-            align-items: center;
-            gap: 15px;
-            border-left: 5px solid #3498db;
-        }}
-        .selected-char {{ font-size: calc(2.5em * {font_scale}); color: #e74c3c; margin: 0; }}
+def card_css(font_scale):
+    """Result card rules, shared by the page and the in-browser filtering iframe."""
+    return f"""
         .details {{ font-size: calc(1.5em * {font_scale}); color: #34495e; margin: 0; }}
         .details strong {{ color: #2c3e50; }}
-        .results-header {{ font-size: calc(1.5em * {font_scale}); color: #2c3e50; margin: 20px 0 10px; }}
         .char-card {{
             background-color: #ffffff;
             padding: 15px;
@@ -42,6 +38,7 @@ def apply_dynamic_css():
             box-shadow: 0 3px 8px rgba(0,0,0,0.15);
         }}
         .char-title {{ font-size: calc(1.4em * {font_scale}); color: #e74c3c; margin: 0; display: inline; }}
+        .phrase-count {{ font-size: calc(0.9em * {font_scale}); color: #7f8c8d; margin-left: 8px; }}
         .compounds-section {{
             background-color: #f1f8e9;
             padding: 10px;
@@ -50,6 +47,26 @@ def apply_dynamic_css():
         }}
         .compounds-title {{ font-size: calc(1.1em * {font_scale}); color: #558b2f; margin: 0 0 5px; }}
         .compounds-list {{ font-size: calc(1em * {font_scale}); color: #34495e; margin: 0; }}
+    """
+
+def apply_dynamic_css():
+    font_scale = st.session_state.get('font_scale', 1.0)
+    css = f"""
+    <style>
+        .selected-card {{
+            background-color: #e8f4f8;
+            padding: 15px;
+            border-radius: 10px;
+            margin-bottom: 20px;
+            box-shadow: 0 2px 5px rgba(0,0,0,0.1);
+            display: flex;
+            align-items: center;
+            gap: 15px;
+            border-left: 5px solid #3498db;
+        }}
+        .selected-char {{ font-size: calc(2.5em * {font_scale}); color: #e74c3c; margin: 0; }}
+        .results-header {{ font-size: calc(1.5em * {font_scale}); color: #2c3e50; margin: 20px 0 10px; }}
+        {card_css(font_scale)}
         .stContainer {{
             padding: 10px;
             border: 1px solid #e0e0e0;
@@ -89,77 +106,148 @@ def apply_dynamic_css():
     """
     st.markdown(css, unsafe_allow_html=True)
 
+# Data shared by every session, reloaded in place when the file changes
+HOT_RELOAD_INTERVAL = 2.0  # seconds between checks of the data file
+LAZY_TEXT = True  # with a compiled artifact, read definitions, etymology and compounds on demand
+
+@st.cache_resource
+def get_live_data(path=DATA_FILE):
+    """Load the component map and build its engine once per process, then watch the file.
+
+    Raises on failure so that a broken file is not cached and the next rerun retries the load.
+    """
+    live = LiveData(path, HOT_RELOAD_INTERVAL, lazy_text=LAZY_TEXT)
+    live.listeners.append(lambda snapshot: get_result_cache().clear())
+    live.listeners.append(lambda snapshot: get_prefetch_cache().clear())
+    return live.start()
+
 # Load component map
-@st.cache_data
-def load_component_map():
+def load_snapshot():
+    """The current snapshot, read once per rerun so the whole rerun sees one version."""
     try:
-        with open("enhanced_component_map_with_etymology.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-            # Clean decompositions by removing '?' and logging warnings
-            for char, entry in data.items():
-                decomposition = entry.get("meta", {}).get("decomposition", "")
-                if '?' in decomposition:
-                    st.session_state.diagnostic_messages.append({
-                        "type": "warning",
-                        "message": f"Invalid component '?' in decomposition for {char}: {decomposition}"
-                    })
-                    entry["meta"]["decomposition"] = ""
-            return data
+        return get_live_data().current
     except Exception as e:
-        error_msg = f"Failed to load enhanced_component_map_with_etymology.json: {e}"
-        st.error(error_msg)
-        st.session_state.diagnostic_messages.append({"type": "error", "message": error_msg})
-        return {}
+        error_msg = f"Failed to load {DATA_FILE}: {e}"
+        component_map = freeze({})
+        return Snapshot(0, component_map, freeze({
+            "source": DATA_FILE,
+            "loaded_at": time.time(),
+            "load_seconds": 0.0,
+            "entries": 0,
+            "messages": [{"type": "error", "message": error_msg}],
+        }), QueryEngine(component_map), {}, None)
 
-component_map = load_component_map()
+snapshot = load_snapshot()
+component_map, load_report, engine = snapshot.component_map, snapshot.report, snapshot.engine
+facet_index = engine.facet_index
+decomposition_index = engine.decomposition_index
+position_index = engine.position_index
+column_store = engine.column_store
 
-# Utility functions
-def clean_field(field):
-    return field[0] if isinstance(field, list) and field else field or "—"
+def format_decomposition(char):
+    return engine.format_decomposition(char)
 
-def get_stroke_count(char):
-    strokes = component_map.get(char, {}).get("meta", {}).get("strokes", None)
-    try:
-        if isinstance(strokes, (int, float)) and strokes > 0:
-            return int(strokes)
-        elif isinstance(strokes, str) and strokes.isdigit():
-            return int(strokes)
-    except (TypeError, ValueError):
-        pass
-    return None
-
-def get_etymology_text(meta):
-    etymology = meta.get("etymology", {})
-    hint = clean_field(etymology.get("hint", "No hint available"))
-    details = clean_field(etymology.get("details", ""))
-    return f"{hint}{'; Details: ' + details if details and details != '—' else ''}"
+def filter_components(stroke_count, radical, component_idc):
+    return engine.filter_components(stroke_count, radical, component_idc)
 
-def format_decomposition(char):
-    """Format the decomposition to show full structure, ignoring invalid components."""
-    decomposition = component_map.get(char, {}).get("meta", {}).get("decomposition", "")
-    if not decomposition or '?' in decomposition:
-        return "—"
-    if decomposition[0] not in IDC_CHARS:
-        return decomposition
-    return decomposition
-
-def get_all_components(char, max_depth, depth=0, seen=None):
-    if seen is None:
-        seen = set()
-    if char in seen or depth > max_depth or not isinstance(char, str) or len(char) != 1:
-        return set()
-    seen.add(char)
-    components = set()
-    decomposition = component_map.get(char, {}).get("meta", {}).get("decomposition", "")
-    if decomposition:
-        for comp in decomposition:
-            if comp in IDC_CHARS or comp == '?' or not isinstance(comp, str) or len(comp) != 1:
-                continue
-            components.add(comp)
-            components.update(get_all_components(comp, max_depth, depth + 1, seen.copy()))
-    return components
+def get_all_components(char, max_depth):
+    return engine.get_all_components(char, max_depth)
+
+def get_compounds(char, length):
+    return engine.get_compounds(char, length)
+
+def get_phrase_count(char, length):
+    return engine.get_phrase_count(char, length)
+
+SEARCH_LIMIT = 50
+
+def search_text(text):
+    return engine.search_text(text, SEARCH_LIMIT)
+
+# Precomputed dropdown labels and card details
+def format_labels(char):
+    return engine.cached_labels(char)
+
+label_table = engine.label_table()
+
+def get_option_label(char):
+    label = label_table["labels"].get(char)
+    if label is None:
+        return char if char in ("Select a component...", "Select a character...", "Select a match...") else engine.cached_label(char)
+    return label
+
+def get_details_html(char):
+    details = label_table["details"].get(char)
+    return details if details is not None else format_labels(char)[1]
+
+# Process-wide cache of finished result lists
+RESULT_CACHE_MAX_ENTRIES = 1024
+RESULT_CACHE_MAX_BYTES = 64 << 20
+RESULT_CACHE_TTL = None  # seconds; None keeps entries until evicted
+
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL)
+
+result_cache = get_result_cache()
+
+# Background prefetch of the likely next queries, shared by every session
+PREFETCH_WORKERS = 1
+PREFETCH_MAX_PENDING = 32
+PREFETCH_TOP_N = 8  # leading result characters, plus the selected component's direct components
+# Prefetched results wait in their own small cache, so they never evict what sessions are
+# showing; a foreground lookup moves an entry into the result cache.
+PREFETCH_CACHE_MAX_ENTRIES = 64
+PREFETCH_CACHE_MAX_BYTES = 8 << 20
+
+@st.cache_resource
+def get_prefetcher():
+    return Prefetcher(PREFETCH_WORKERS, PREFETCH_MAX_PENDING)
+
+prefetcher = get_prefetcher()
+
+@st.cache_resource
+def get_prefetch_cache():
+    return ResultCache(PREFETCH_CACHE_MAX_ENTRIES, PREFETCH_CACHE_MAX_BYTES, RESULT_CACHE_TTL)
+
+prefetch_cache = get_prefetch_cache()
+
+# Per-session instrumentation: bounded logs and rolling stage timings
+DEBUG_LOG_SIZE = 100
+DIAGNOSTIC_BUFFER_SIZE = 200
+TIMING_WINDOW = 50
+
+def log_debug(message):
+    st.session_state.debug_log.append(message)
+
+def request_profile():
+    st.session_state.profile_requested = True
 
 # Session state initialization
+# Results-panel settings; current_query falls back to these for a key that is missing
+PANEL_DEFAULTS = {
+    "selected_idc": "No Filter",
+    "output_radical": "No Filter",
+    "display_mode": "Single Character",
+    "containment_depth": 0,
+    "component_position": "No Filter",
+    "position_outermost": False,
+    "query_include": (),
+    "query_exclude": (),
+    "result_order": "Strokes",
+    "page_size": 50,
+    "pagination_mode": "Pages",
+}
+# What Reset Filters restores: the input filters and every results-panel filter, but not
+# the output type, order or paging
+FILTER_DEFAULTS = {
+    "stroke_count": 0,
+    "radical": "No Filter",
+    "component_idc": "No Filter",
+    **{field: value for field, value in PANEL_DEFAULTS.items()
+       if field not in ("display_mode", "result_order", "page_size", "pagination_mode")},
+}
+
 def init_session_state():
     config_options = [
         {"selected_comp": "爫", "stroke_count": 0, "radical": "No Filter", "selected_idc": "No Filter", "component_idc": "No Filter", "output_radical": "No Filter", "display_mode": "Single Character"},
@@ -171,6 +259,7 @@ def init_session_state():
     ]
     selected_config = random.choice(config_options)
     defaults = {
+        **PANEL_DEFAULTS,
         "selected_comp": selected_config["selected_comp"],
         "stroke_count": selected_config["stroke_count"],
         "radical": selected_config["radical"],
@@ -179,12 +268,24 @@ def init_session_state():
         "component_idc": selected_config["component_idc"],
         "output_radical": selected_config["output_radical"],
         "text_input_comp": "",
+        "search_query": "",
+        "search_select": "Select a match...",
         "page": 1,
+        "export_format": "CSV",
+        "client_filtering": False,
+        "relation_char": "",
+        "sibling_min_shared": 2,
         "previous_selected_comp": selected_config["selected_comp"],
         "text_input_warning": None,
-        "debug_info": "",
+        "debug_log": deque(maxlen=DEBUG_LOG_SIZE),
         "last_processed_input": "",
-        "diagnostic_messages": [],
+        "last_result_key": None,
+        "prefetch_owner": uuid.uuid4().hex,
+        "app_rerun_needed": False,
+        "diagnostic_messages": deque(maxlen=DIAGNOSTIC_BUFFER_SIZE),
+        "rerun_timings": RerunTimings(TIMING_WINDOW),
+        "profile_requested": False,
+        "last_profile": None,
         "font_scale": 1.0
     }
     for key, value in defaults.items():
@@ -192,42 +293,176 @@ def init_session_state():
 
 init_session_state()
 
+def get_result_candidates(comp):
+    """IDs of characters containing comp under the current depth, query and position filters."""
+    query = current_query(comp)
+    position = query["component_position"]
+    return engine.candidates(
+        comp, query["query_include"], query["query_exclude"], query["containment_depth"],
+        None if position == "No Filter" else position, query["position_outermost"],
+    )
+
+QUERY_FIELDS = (
+    "selected_comp", "query_include", "query_exclude", "containment_depth", "component_position",
+    "position_outermost", "selected_idc", "output_radical", "display_mode", "result_order",
+)
+
+def current_query(comp):
+    """The session's result query for comp as a plain dict, safe to hand to worker threads."""
+    query = {field: st.session_state.get(field, PANEL_DEFAULTS.get(field)) for field in QUERY_FIELDS}
+    query["selected_comp"] = comp
+    return query
+
+def result_cache_key(query):
+    """Everything that determines the result list, in one hashable tuple."""
+    return (
+        snapshot.version, query["selected_comp"], query["selected_idc"], query["output_radical"], query["display_mode"],
+        (query["query_include"], query["query_exclude"], query["containment_depth"],
+         query["component_position"], query["position_outermost"], query["result_order"]),
+    )
+
+def compute_results(query):
+    """Ordered result IDs and the compounds they list, in export order."""
+    position = query["component_position"]
+    return engine.results(
+        query["selected_comp"], query["query_include"], query["query_exclude"], query["containment_depth"],
+        None if position == "No Filter" else position, query["position_outermost"],
+        idc=query["selected_idc"], radical=query["output_radical"], length=phrase_length(query["display_mode"]),
+        order="phrases" if query["result_order"] == "Most phrases" else "strokes",
+    )
+
+def get_results(comp):
+    query = current_query(comp)
+    key = result_cache_key(query)
+    if key != st.session_state.last_result_key:
+        # Count each new query once for the prefetch hit rate, not every rerun showing it
+        st.session_state.last_result_key = key
+        prefetcher.lookup(key)
+    return cached_or_prefetched(key, lambda: compute_results(query))
+
+def cached_or_prefetched(key, compute):
+    """The result cache's value for key; on a miss, a prefetched value is moved over
+    from the prefetch cache, or compute() runs."""
+    missing = object()
+
+    def take_or_compute():
+        value = prefetch_cache.pop(key, missing)
+        return compute() if value is missing else value
+    return result_cache.get_or_compute(key, take_or_compute)
+
+def page_cache_key(query, page, page_size):
+    return ("page", result_cache_key(query), page, page_size)
+
+# Prefetch
+def predicted_query(query, comp):
+    """The query on_output_char_select would run for comp: the output filters drop any
+    value that comp's candidates do not offer, as render_output_filters does."""
+    query = dict(query, selected_comp=comp, query_include=(), query_exclude=())
+    position = query["component_position"]
+    candidates = engine.candidates(
+        comp, (), (), query["containment_depth"], None if position == "No Filter" else position, query["position_outermost"]
+    )
+    if query["selected_idc"] not in column_store.idc_options(candidates):
+        query["selected_idc"] = "No Filter"
+    if query["output_radical"] not in column_store.radical_options(candidates):
+        query["output_radical"] = "No Filter"
+    if position not in position_index["positions"].get(comp, []):
+        query["component_position"] = "No Filter"
+    return query
+
+def prefetch_task(query, comp, page_size):
+    """Generator function computing comp's predicted results, then their first page of
+    cards, into the prefetch cache under the keys get_results and render_results_page
+    look up."""
+    def task():
+        next_query = predicted_query(query, comp)
+        key = result_cache_key(next_query)
+        if key in result_cache or key in prefetch_cache:
+            return
+        result = compute_results(next_query)
+        prefetch_cache.put(key, result)
+        yield key
+        page_key = page_cache_key(next_query, 1, page_size)
+        if page_key not in result_cache and page_key not in prefetch_cache:
+            prefetch_cache.put(page_key, page_html(column_store.to_chars(result[0][:page_size]), next_query["display_mode"]))
+            yield page_key
+    return task
+
+def schedule_prefetch(comp, result_ids):
+    """Queue the output characters and components most likely to be clicked next,
+    replacing this session's previous batch."""
+    query = current_query(comp)
+    chars = column_store.to_chars(result_ids[:PREFETCH_TOP_N])
+    components = sorted(get_all_components(comp, max_depth=0) - {comp}, key=column_store.ids.get)
+    targets = list(dict.fromkeys(chars + components[:PREFETCH_TOP_N]))
+    prefetcher.submit(
+        st.session_state.prefetch_owner,
+        [prefetch_task(query, char, st.session_state.page_size) for char in targets if char in component_map],
+    )
+
+# In-browser filtering
+CLIENT_FILTER_HEIGHT = 900
+
+def client_cache_key(query, page_size, font_scale):
+    return (
+        "client", snapshot.version, query["selected_comp"], query["query_include"], query["query_exclude"],
+        query["containment_depth"], query["component_position"], query["position_outermost"],
+        query["display_mode"], query["result_order"], page_size, font_scale,
+    )
+
+def client_page(query, page_size, font_scale):
+    """The self-contained filtering page for the query's candidates."""
+    position = query["component_position"]
+    payload = engine.client_payload(
+        query["selected_comp"], query["query_include"], query["query_exclude"], query["containment_depth"],
+        None if position == "No Filter" else position, query["position_outermost"],
+    )
+    details = [(get_details_html(char), pinyin, definition)
+               for char, _, pinyin, definition in export_rows(engine, column_store.ids_of(payload["chars"]), 0)]
+    return client_filter_html(
+        payload, details, format_component_query(query["selected_comp"]), card_css(font_scale), IDC_DESCRIPTIONS,
+        length=phrase_length(query["display_mode"]), order=query["result_order"], page_size=page_size,
+    )
+
+def export_file(ids, length, fmt, engine=engine):
+    """Callable building the export on click; the rerun only sends the button."""
+    return lambda: "".join(export_lines(export_rows(engine, ids, length), fmt)).encode("utf-8")
+
 # Callback functions
 def process_text_input(component_map):
     try:
         text_value = st.session_state.text_input_comp.strip()
-        st.session_state.debug_info = f"Input received: '{text_value}'"
+        log_debug(f"Input received: '{text_value}'")
         
         if text_value == st.session_state.last_processed_input:
-            st.session_state.debug_info += "; Input already processed, skipping"
+            log_debug("Input already processed, skipping")
             return
         
-        radicals = {c for c in component_map if component_map.get(c, {}).get("meta", {}).get("radical", "") == c}
-        st.session_state.debug_info += f"; {len(radicals)} radicals in component_map"
+        log_debug(f"{len(facet_index['self_radicals'])} radicals in component_map")
 
+        if len(text_value) > 1:
+            process_component_query(component_map, text_value)
+            return
         if len(text_value) != 1:
             warning_msg = "Please enter exactly one character."
             st.session_state.text_input_warning = warning_msg
             st.session_state.diagnostic_messages.append({"type": "warning", "message": warning_msg})
-            st.session_state.debug_info += "; Invalid length"
+            log_debug("Invalid length")
             st.session_state.text_input_comp = ""
             st.session_state.last_processed_input = text_value
             return
         if text_value in component_map:
-            st.session_state.debug_info += f"; Component '{text_value}' is valid"
+            log_debug(f"Component '{text_value}' is valid")
+            clear_component_query()
             st.session_state.previous_selected_comp = st.session_state.selected_comp
             st.session_state.selected_comp = text_value
             st.session_state.page = 1
             st.session_state.text_input_warning = None
-            filtered_components = [
-                comp for comp in component_map
-                if isinstance(comp, str) and len(comp) == 1 and
-                (st.session_state.stroke_count == 0 or get_stroke_count(comp) == st.session_state.stroke_count) and
-                (st.session_state.radical == "No Filter" or component_map.get(comp, {}).get("meta", {}).get("radical", "") == st.session_state.radical) and
-                (st.session_state.component_idc == "No Filter" or component_map.get(comp, {}).get("meta", {}).get("decomposition", "").startswith(st.session_state.component_idc))
-            ]
+            filtered_components = filter_components(
+                st.session_state.stroke_count, st.session_state.radical, st.session_state.component_idc
+            )
             if text_value not in filtered_components:
-                st.session_state.debug_info += f"; '{text_value}' not in filtered components, resetting filters"
+                log_debug(f"'{text_value}' not in filtered components, resetting filters")
                 st.session_state.stroke_count = 0
                 st.session_state.radical = "No Filter"
                 st.session_state.component_idc = "No Filter"
@@ -237,23 +472,63 @@ def process_text_input(component_map):
             warning_msg = "Invalid character. Please enter a valid component."
             st.session_state.text_input_warning = warning_msg
             st.session_state.diagnostic_messages.append({"type": "warning", "message": warning_msg})
-            st.session_state.debug_info += f"; Invalid component '{text_value}'"
+            log_debug(f"Invalid component '{text_value}'")
             st.session_state.text_input_comp = ""
             st.session_state.last_processed_input = text_value
     except Exception as e:
         error_msg = f"Error processing input: {str(e)}"
         st.session_state.text_input_warning = error_msg
         st.session_state.diagnostic_messages.append({"type": "error", "message": error_msg})
-        st.session_state.debug_info += f"; Error: {str(e)}"
+        log_debug(f"Error: {str(e)}")
+        st.session_state.text_input_comp = ""
+        st.session_state.last_processed_input = text_value
+
+def process_component_query(component_map, text_value):
+    include, exclude = parse_component_query(text_value)
+    unknown = [c for c in include + exclude if c not in decomposition_index["ids"]]
+    if not include or unknown or include[0] not in component_map:
+        warning_msg = (
+            f"Unknown component(s): {' '.join(unknown)}" if unknown else
+            "Please enter one or more components, optionally followed by -exclusions (e.g. 氵木-口)."
+        )
+        st.session_state.text_input_warning = warning_msg
+        st.session_state.diagnostic_messages.append({"type": "warning", "message": warning_msg})
+        log_debug(f"Invalid component query '{text_value}'")
         st.session_state.text_input_comp = ""
         st.session_state.last_processed_input = text_value
+        return
+    log_debug(f"Component query include={''.join(include)} exclude={''.join(exclude)}")
+    st.session_state.previous_selected_comp = st.session_state.selected_comp
+    st.session_state.selected_comp = include[0]
+    st.session_state.query_include = include[1:]
+    st.session_state.query_exclude = exclude
+    st.session_state.page = 1
+    st.session_state.text_input_warning = None
+    if include[0] not in filter_components(
+        st.session_state.stroke_count, st.session_state.radical, st.session_state.component_idc
+    ):
+        st.session_state.stroke_count = 0
+        st.session_state.radical = "No Filter"
+        st.session_state.component_idc = "No Filter"
+    st.session_state.last_processed_input = text_value
+
+def clear_component_query():
+    st.session_state.query_include = ()
+    st.session_state.query_exclude = ()
+
+def format_component_query(comp):
+    text = " + ".join((comp,) + st.session_state.query_include)
+    if st.session_state.query_exclude:
+        text += " − " + " − ".join(st.session_state.query_exclude)
+    return text
 
 def on_selectbox_change():
+    clear_component_query()
     st.session_state.previous_selected_comp = st.session_state.selected_comp
     st.session_state.page = 1
     st.session_state.text_input_warning = None
     st.session_state.text_input_comp = st.session_state.selected_comp
-    st.session_state.debug_info = f"Selectbox changed to '{st.session_state.selected_comp}'"
+    log_debug(f"Selectbox changed to '{st.session_state.selected_comp}'")
 
 def on_output_char_select(component_map):
     selected_char = st.session_state.output_char_select
@@ -263,51 +538,87 @@ def on_output_char_select(component_map):
             st.session_state.diagnostic_messages.append({"type": "warning", "message": warning_msg})
         st.session_state.output_char_select = "Select a character..."
         return
+    clear_component_query()
     st.session_state.previous_selected_comp = st.session_state.selected_comp
     st.session_state.selected_comp = selected_char
     st.session_state.page = 1
     st.session_state.text_input_warning = None
     st.session_state.text_input_comp = selected_char
-    st.session_state.debug_info = f"Output char selected: '{selected_char}'"
+    st.session_state.app_rerun_needed = True
+    log_debug(f"Output char selected: '{selected_char}'")
+
+def on_search_select(component_map):
+    selected_char = st.session_state.search_select
+    if selected_char not in component_map:
+        st.session_state.search_select = "Select a match..."
+        return
+    clear_component_query()
+    st.session_state.previous_selected_comp = st.session_state.selected_comp
+    st.session_state.selected_comp = selected_char
+    st.session_state.page = 1
+    st.session_state.text_input_warning = None
+    st.session_state.text_input_comp = selected_char
+    if selected_char not in filter_components(
+        st.session_state.stroke_count, st.session_state.radical, st.session_state.component_idc
+    ):
+        st.session_state.stroke_count = 0
+        st.session_state.radical = "No Filter"
+        st.session_state.component_idc = "No Filter"
+    st.session_state.search_select = "Select a match..."
+    log_debug(f"Search match selected: '{selected_char}'")
+
+def reset_page():
+    st.session_state.page = 1
+
+def change_page(step):
+    st.session_state.page += step
+
+# Results-panel settings outlive their widgets: browser filtering stops rendering some of
+# them, and a fragment run drops the state of every widget it did not render. These
+# widgets are keyed "<field>_widget" and copy their value into field on change.
+def widget_key(field):
+    """Seed field's widget with the stored value; returns the widget key."""
+    key = f"{field}_widget"
+    st.session_state[key] = st.session_state[field]
+    return key
+
+def on_widget_change(field):
+    st.session_state[field] = st.session_state[f"{field}_widget"]
+    reset_page()
 
 def on_reset_filters():
-    st.session_state.stroke_count = 0
-    st.session_state.radical = "No Filter"
-    st.session_state.component_idc = "No Filter"
-    st.session_state.selected_idc = "No Filter"
-    st.session_state.output_radical = "No Filter"
+    for field, value in FILTER_DEFAULTS.items():
+        st.session_state[field] = value
     st.session_state.page = 1
     st.session_state.text_input_warning = None
     st.session_state.text_input_comp = ""
-    st.session_state.debug_info = "Filters reset"
+    st.session_state.app_rerun_needed = True
+    log_debug("Filters reset")
 
 def is_reset_needed():
-    return (
-        st.session_state.stroke_count != 0 or
-        st.session_state.radical != "No Filter" or
-        st.session_state.component_idc != "No Filter" or
-        st.session_state.selected_idc != "No Filter" or
-        st.session_state.output_radical != "No Filter"
-    )
+    return any(st.session_state.get(field, value) != value for field, value in FILTER_DEFAULTS.items())
 
 # Render controls
-def render_controls(component_map):
-    idc_descriptions = {
-        "No Filter": "No Filter",
-        "⿰": "Left Right",
-        "⿱": "Top Bottom",
-        "⿲": "Left Middle Right",
-        "⿳": "Top Middle Bottom",
-        "⿴": "Surround",
-        "⿵": "Surround Top",
-        "⿶": "Surround Bottom",
-        "⿷": "Surround Left",
-        "⿸": "Top Left Corner",
-        "⿹": "Top Right Corner",
-        "⿺": "Bottom Left Corner",
-        "⿻": "Overlaid"
-    }
+IDC_DESCRIPTIONS = {
+    "No Filter": "No Filter",
+    "⿰": "Left Right",
+    "⿱": "Top Bottom",
+    "⿲": "Left Middle Right",
+    "⿳": "Top Middle Bottom",
+    "⿴": "Surround",
+    "⿵": "Surround Top",
+    "⿶": "Surround Bottom",
+    "⿷": "Surround Left",
+    "⿸": "Top Left Corner",
+    "⿹": "Top Right Corner",
+    "⿺": "Bottom Left Corner",
+    "⿻": "Overlaid"
+}
+
+def format_idc(idc):
+    return f"{idc} ({IDC_DESCRIPTIONS.get(idc, idc)})" if idc != "No Filter" else idc
 
+def render_input_filters():
     # Filter row for component input filters
     with st.container():
         st.markdown("### Component Filters")
@@ -315,12 +626,7 @@ def render_controls(component_map):
         col1, col2, col3 = st.columns([0.4, 0.4, 0.4])
 
         with col1:
-            stroke_counts = sorted(set(
-                sc for sc in (
-                    get_stroke_count(comp) for comp in component_map
-                    if isinstance(comp, str) and len(comp) == 1
-                ) if isinstance(sc, int) and sc > 0
-            ))
+            stroke_counts = facet_index["stroke_options"]
             if stroke_counts:
                 st.selectbox(
                     "Filter by Strokes:",
@@ -338,17 +644,7 @@ def render_controls(component_map):
                 )
 
         with col2:
-            pre_filtered_components = [
-                comp for comp in component_map
-                if isinstance(comp, str) and len(comp) == 1 and
-                (st.session_state.stroke_count == 0 or get_stroke_count(comp) == st.session_state.stroke_count)
-            ]
-            radicals = {"No Filter"} | {
-                component_map.get(c, {}).get("meta", {}).get("radical", "")
-                for c in pre_filtered_components
-                if isinstance(c, str) and len(c) == 1 and component_map.get(c, {}).get("meta", {}).get("radical", "")
-            }
-            radical_options = ["No Filter"] + sorted(radicals - {"No Filter"})
+            radical_options = ["No Filter"] + facet_index["radical_options"].get(st.session_state.stroke_count, [])
             if st.session_state.radical not in radical_options:
                 st.session_state.radical = "No Filter"
             st.selectbox(
@@ -359,46 +655,38 @@ def render_controls(component_map):
             )
 
         with col3:
-            pre_filtered_components = [
-                comp for comp in component_map
-                if isinstance(comp, str) and len(comp) == 1 and
-                (st.session_state.stroke_count == 0 or get_stroke_count(comp) == st.session_state.stroke_count) and
-                (st.session_state.radical == "No Filter" or component_map.get(comp, {}).get("meta", {}).get("radical", "") == st.session_state.radical)
-            ]
-            component_idcs = {"No Filter"} | {
-                component_map.get(c, {}).get("meta", {}).get("decomposition", "")[0]
-                for c in pre_filtered_components
-                if isinstance(c, str) and len(c) == 1 and component_map.get(c, {}).get("meta", {}).get("decomposition", "") and component_map.get(c, {}).get("meta", {}).get("decomposition", "")[0] in IDC_CHARS
-            }
-            component_idc_options = ["No Filter"] + sorted(component_idcs - {"No Filter"})
+            component_idc_options = ["No Filter"] + facet_index["idc_options"].get(
+                (st.session_state.stroke_count, st.session_state.radical), []
+            )
             if st.session_state.component_idc not in component_idc_options:
                 st.session_state.component_idc = "No Filter"
             st.selectbox(
                 "Filter by Structure IDC:",
                 options=component_idc_options,
-                format_func=lambda x: f"{x} ({idc_descriptions.get(x, x)})" if x != "No Filter" else x,
+                format_func=format_idc,
                 index=component_idc_options.index(st.session_state.component_idc),
                 key="component_idc"
             )
 
-    # Input row for component selection
+def render_input_selection(component_map):
+    """Component dropdown, typed input and text search; False when no component is selectable."""
     with st.container():
         st.markdown("### Select Input Component")
-        st.caption("Choose or type a single character to explore its related characters.")
+        st.caption("Choose or type a single character to explore its related characters, or type several components (with -exclusions) to find characters containing all of them.")
         col4, col5 = st.columns([1.5, 0.2])
 
         with col4:
-            filtered_components = [
-                comp for comp in component_map
-                if isinstance(comp, str) and len(comp) == 1 and
-                (st.session_state.stroke_count == 0 or get_stroke_count(comp) == st.session_state.stroke_count) and
-                (st.session_state.radical == "No Filter" or component_map.get(comp, {}).get("meta", {}).get("radical", "") == st.session_state.radical) and
-                (st.session_state.component_idc == "No Filter" or component_map.get(comp, {}).get("meta", {}).get("decomposition", "").startswith(st.session_state.component_idc))
-            ]
+            component_mask = column_store.mask(
+                st.session_state.stroke_count, st.session_state.radical, st.session_state.component_idc
+            )
+            component_ids = np.flatnonzero(component_mask)
             # Add components from the selected character's decomposition
             selected_char_components = get_all_components(st.session_state.selected_comp, max_depth=5) if st.session_state.selected_comp else set()
-            filtered_components.extend([comp for comp in selected_char_components if comp not in filtered_components and comp in component_map])
-            sorted_components = sorted(filtered_components, key=lambda c: get_stroke_count(c) or 0)
+            extra_ids = column_store.ids_of(comp for comp in selected_char_components if comp in component_map)
+            extra_ids = np.sort(extra_ids[~component_mask[extra_ids]])
+            sorted_components = column_store.to_chars(
+                column_store.sort_by_strokes(np.concatenate([component_ids, extra_ids]))
+            )
             
             if not sorted_components:
                 st.session_state.selected_comp = ""
@@ -406,26 +694,19 @@ def render_controls(component_map):
                 warning_msg = "No components match the current filters. Please adjust the stroke count, radical, or IDC filters."
                 st.session_state.diagnostic_messages.append({"type": "warning", "message": warning_msg})
                 st.warning(warning_msg)
-                return
+                return False
             if st.session_state.selected_comp not in sorted_components:
+                clear_component_query()
                 st.session_state.selected_comp = sorted_components[0]
                 st.session_state.text_input_comp = sorted_components[0]
-                st.session_state.debug_info += f"; Reset selected_comp to '{sorted_components[0]}' due to filters"
+                log_debug(f"Reset selected_comp to '{sorted_components[0]}' due to filters")
 
             index = sorted_components.index(st.session_state.selected_comp) if st.session_state.selected_comp in sorted_components else 0
             st.selectbox(
                 "Select a component:",
                 options=sorted_components,
                 index=index,
-                format_func=lambda c: (
-                    c if c == "Select a component..." else
-                    f"{c} (Pinyin: {clean_field(component_map.get(c, {}).get('meta', {}).get('pinyin', '—'))}, "
-                    f"Strokes: {get_stroke_count(c) or 'unknown'}, "
-                    f"Radical: {clean_field(component_map.get(c, {}).get('meta', {}).get('radical', '—'))}, "
-                    f"Decomposition: {format_decomposition(c)}, "
-                    f"Definition: {clean_field(component_map.get(c, {}).get('meta', {}).get('definition', 'No definition available'))}, "
-                    f"Etymology: {get_etymology_text(component_map.get(c, {}).get('meta', {}))})"
-                ),
+                format_func=get_option_label,
                 key="selected_comp",
                 on_change=on_selectbox_change
             )
@@ -439,9 +720,32 @@ def render_controls(component_map):
                 key="text_input_comp",
                 on_change=process_text_input,
                 args=(component_map,),
-                placeholder="Enter one Chinese character"
+                placeholder="One character, or components like 氵木-口"
             )
 
+        col_search, col_matches = st.columns([0.5, 1.2])
+        with col_search:
+            st.text_input(
+                "Search by pinyin or meaning:",
+                key="search_query",
+                placeholder="e.g. mù, shui3, heart, pictograph"
+            )
+        with col_matches:
+            query = st.session_state.search_query.strip()
+            if query:
+                matches = search_text(query)
+                if matches:
+                    st.selectbox(
+                        f"{len(matches)}{'+' if len(matches) == SEARCH_LIMIT else ''} matches, best first:",
+                        options=["Select a match..."] + matches,
+                        key="search_select",
+                        on_change=on_search_select,
+                        args=(component_map,),
+                        format_func=get_option_label
+                    )
+                else:
+                    st.caption(f"No characters match '{query}'.")
+
     # JavaScript to handle paste events
     components.html("""
         <script>
@@ -458,68 +762,144 @@ def render_controls(component_map):
             });
         </script>
     """, height=0)
+    return True
 
-    # Output filters and results
+def render_output_filters():
     with st.container():
         st.markdown("### Filter Output Characters")
         st.caption("Customize the output by character structure and display mode.")
-        col6, col7, col8 = st.columns([0.33, 0.33, 0.34])
-        with col6:
-            idcs = {"No Filter"} | {
-                component_map.get(c, {}).get("meta", {}).get("decomposition", "")[0]
-                for c in component_map.get(st.session_state.selected_comp, {}).get("related_characters", [])
-                if isinstance(c, str) and len(c) == 1 and component_map.get(c, {}).get("meta", {}).get("decomposition", "") and component_map.get(c, {}).get("meta", {}).get("decomposition", "")[0] in IDC_CHARS
-            }
-            idc_options = ["No Filter"] + sorted(idcs - {"No Filter"})
-            if st.session_state.selected_idc not in idc_options:
-                st.session_state.selected_idc = "No Filter"
+        st.toggle("Filter in the browser", key="client_filtering",
+                  help="Send this component's characters once, then filter, sort and page them without waiting for the server.")
+        if st.session_state.client_filtering:
+            # Result IDC, radical, output type, order and paging live in the results iframe
+            col8, col10, col11 = st.columns([0.34, 0.33, 0.33])
+        else:
+            related_ids = get_result_candidates(st.session_state.selected_comp)
+            col6, col7, col8, col9 = st.columns([0.25, 0.25, 0.25, 0.25])
+            with col6:
+                idc_options = ["No Filter"] + column_store.idc_options(related_ids)
+                if st.session_state.selected_idc not in idc_options:
+                    st.session_state.selected_idc = "No Filter"
+                st.selectbox(
+                    "Result IDC:",
+                    options=idc_options,
+                    format_func=format_idc,
+                    key=widget_key("selected_idc"),
+                    on_change=on_widget_change,
+                    args=("selected_idc",)
+                )
+            with col7:
+                output_radical_options = ["No Filter"] + column_store.radical_options(related_ids)
+                if st.session_state.output_radical not in output_radical_options:
+                    st.session_state.output_radical = "No Filter"
+                st.selectbox(
+                    "Result Radical:",
+                    options=output_radical_options,
+                    key=widget_key("output_radical"),
+                    on_change=on_widget_change,
+                    args=("output_radical",)
+                )
+            with col9:
+                st.radio("Output Type:", ["Single Character", "2-Character Phrases", "3-Character Phrases", "4-Character Phrases"],
+                         key=widget_key("display_mode"), on_change=on_widget_change, args=("display_mode",))
+            col10, col11 = st.columns([0.5, 0.5])
+        with col8:
             st.selectbox(
-                "Result IDC:",
-                options=idc_options,
-                format_func=lambda x: f"{x} ({idc_descriptions.get(x, x)})" if x != "No Filter" else x,
-                index=idc_options.index(st.session_state.selected_idc),
-                key="selected_idc"
+                "Containment Depth:",
+                options=[0, 1, 2, 3],
+                format_func=lambda x: "Any depth" if x == 0 else "Direct" if x == 1 else f"Up to {x} levels",
+                key="containment_depth",
+                on_change=reset_page
             )
-        with col7:
-            output_radicals = {"No Filter"} | {
-                component_map.get(c, {}).get("meta", {}).get("radical", "")
-                for c in component_map.get(st.session_state.selected_comp, {}).get("related_characters", [])
-                if isinstance(c, str) and len(c) == 1 and component_map.get(c, {}).get("meta", {}).get("radical", "")
-            }
-            output_radical_options = ["No Filter"] + sorted(output_radicals - {"No Filter"})
-            if st.session_state.output_radical not in output_radical_options:
-                st.session_state.output_radical = "No Filter"
+        with col10:
+            position_options = ["No Filter"] + position_index["positions"].get(st.session_state.selected_comp, [])
+            if st.session_state.component_position not in position_options:
+                st.session_state.component_position = "No Filter"
             st.selectbox(
-                "Result Radical:",
-                options=output_radical_options,
-                index=output_radical_options.index(st.session_state.output_radical),
-                key="output_radical"
+                f"Position of {st.session_state.selected_comp}:",
+                options=position_options,
+                format_func=lambda x: x if x == "No Filter" else format_position(x),
+                index=position_options.index(st.session_state.component_position),
+                key="component_position",
+                on_change=reset_page
             )
-        with col8:
-            st.radio("Output Type:", ["Single Character", "2-Character Phrases", "3-Character Phrases", "4-Character Phrases"], key="display_mode")
+        with col11:
+            st.checkbox("Outermost structure only", key="position_outermost", on_change=reset_page,
+                        disabled=st.session_state.component_position == "No Filter")
         st.button("Reset Filters", on_click=on_reset_filters, disabled=not is_reset_needed())
 
 # Render character card
-def render_char_card(char, compounds):
-    meta = component_map.get(char, {}).get("meta", {})
-    fields = {
-        "Pinyin": clean_field(meta.get("pinyin", "—")),
-        "Strokes": f"{get_stroke_count(char)} strokes" if get_stroke_count(char) is not None else "unknown strokes",
-        "Radical": clean_field(meta.get("radical", "—")),
-        "Decomposition": format_decomposition(char),
-        "Definition": clean_field(meta.get("definition", "No definition available")),
-        "Etymology": get_etymology_text(meta)
-    }
-    details = " ".join(f"<strong>{k}:</strong> {v}" for k, v in fields.items())
-    st.markdown(f"""<div class='char-card'><h3 class='char-title'>{char}</h3><p class='details'>{details}</p>""", unsafe_allow_html=True)
-    if compounds and st.session_state.display_mode != "Single Character":
-        compounds_text = " ".join(sorted(compounds))
-        st.markdown(f"""<div class='compounds-section'><p class='compounds-title'>{st.session_state.display_mode} for {char}:</p><p class='compounds-list'>{compounds_text}</p></div>""", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+def format_result_card(char, display_mode):
+    length = phrase_length(display_mode)
+    return format_char_card(
+        char, get_details_html(char), get_phrase_count(char, length), get_compounds(char, length),
+        f"{display_mode} for {char}:"
+    )
+
+def page_html(chars, display_mode):
+    return "".join(format_result_card(c, display_mode) for c in chars)
+
+def render_results_page(chars, page):
+    """Render a page of cards as one markdown element (one delta instead of three per card)."""
+    query = current_query(st.session_state.selected_comp)
+    html = cached_or_prefetched(
+        page_cache_key(query, page, st.session_state.page_size), lambda: page_html(chars, query["display_mode"])
+    )
+    st.markdown(html, unsafe_allow_html=True)
+
+def render_results(filtered_chars):
+    page_size = st.session_state.page_size
+    page_count = max(1, -(-len(filtered_chars) // page_size))
+    st.session_state.page = min(max(st.session_state.page, 1), page_count)
+    page = st.session_state.page
+    if st.session_state.pagination_mode == "Load more":
+        # Pages already on screen are re-emitted unchanged, so Streamlit's message cache
+        # sends them as hash references and only the new page's HTML goes over the wire
+        for p in range(page):
+            render_results_page(filtered_chars[p * page_size:(p + 1) * page_size], p + 1)
+        if page < page_count:
+            remaining = len(filtered_chars) - page * page_size
+            st.button(f"Load more ({remaining} remaining)", on_click=change_page, args=(1,), key="load_more")
+        return
+    render_results_page(filtered_chars[(page - 1) * page_size:page * page_size], page)
+    if page_count > 1:
+        col_prev, col_page, col_next = st.columns([0.2, 0.6, 0.2])
+        with col_prev:
+            st.button("◀ Previous", on_click=change_page, args=(-1,), disabled=page <= 1, key="page_prev")
+        with col_page:
+            first = (page - 1) * page_size + 1
+            st.markdown(f"<p style='text-align:center'>Page {page} of {page_count} ({first}–{min(page * page_size, len(filtered_chars))} of {len(filtered_chars)})</p>", unsafe_allow_html=True)
+        with col_next:
+            st.button("Next ▶", on_click=change_page, args=(1,), disabled=page >= page_count, key="page_next")
+
+# Output character selector
+def render_output_select(filtered_chars):
+    if not filtered_chars:
+        return
+    # Add components from the selected character's decomposition to output options
+    selected_char_components = get_all_components(st.session_state.selected_comp, max_depth=5) if st.session_state.selected_comp else set()
+    output_options = filtered_chars + [comp for comp in selected_char_components if comp not in filtered_chars and comp in component_map]
+    options = ["Select a character..."] + column_store.to_chars(column_store.sort_by_strokes(column_store.ids_of(output_options)))
+    if (st.session_state.previous_selected_comp and
+            st.session_state.previous_selected_comp != st.session_state.selected_comp and
+            st.session_state.previous_selected_comp not in output_options and
+            st.session_state.previous_selected_comp in component_map):
+        options.insert(1, st.session_state.previous_selected_comp)
+    st.selectbox(
+        "Select a character from the list below:",
+        options=options,
+        key="output_char_select",
+        on_change=on_output_char_select,
+        args=(component_map,),
+        format_func=get_option_label
+    )
 
 # Main function
 def main():
     if not component_map:
+        for msg in load_report["messages"]:
+            if msg["type"] == "error":
+                st.error(msg["message"])
         error_msg = "No data available. Please check the JSON file."
         st.error(error_msg)
         st.session_state.diagnostic_messages.append({"type": "error", "message": error_msg})
@@ -529,94 +909,140 @@ def main():
     apply_dynamic_css()
 # 🈶 🈯
     st.markdown("<h1>🈑 Radix</h1>", unsafe_allow_html=True)
-    render_controls(component_map)
+    timings = st.session_state.rerun_timings
+    with timings.span("controls"):
+        render_input_filters()
+        selectable = render_input_selection(component_map)
 
-    if not st.session_state.selected_comp:
+    if not selectable or not st.session_state.selected_comp:
         st.info("Please select or type a component to view results.")
         return
 
-    meta = component_map.get(st.session_state.selected_comp, {}).get("meta", {})
-    fields = {
-        "Pinyin": clean_field(meta.get("pinyin", "—")),
-        "Strokes": f"{get_stroke_count(st.session_state.selected_comp)} strokes" if get_stroke_count(st.session_state.selected_comp) is not None else "unknown strokes",
-        "Radical": clean_field(meta.get("radical", "—")),
-        "Decomposition": format_decomposition(st.session_state.selected_comp),
-        "Definition": clean_field(meta.get("definition", "No definition available")),
-        "Etymology": get_etymology_text(meta)
-    }
-    details = " ".join(f"<strong>{k}:</strong> {v}" for k, v in fields.items())
+    render_results_panel()
+
+# Results panel
+@st.fragment
+def render_results_panel():
+    """Output filters, the selected card and the results. Widgets in here rerun only this
+    function; callbacks that change the input component set app_rerun_needed instead."""
+    timings = st.session_state.rerun_timings
+    fragment_rerun = timings.current is None
+    if fragment_rerun and st.session_state.app_rerun_needed:
+        st.session_state.app_rerun_needed = False
+        st.rerun()
+    st.session_state.app_rerun_needed = False
+    if fragment_rerun:
+        timings.start()
+    try:
+        with timings.span("panel"):
+            with timings.span("output_filters"):
+                render_output_filters()
+            render_results_section(timings)
+            with timings.span("relations"), st.expander(f"🔗 How {st.session_state.selected_comp} relates to other characters"):
+                render_relations(st.session_state.selected_comp)
+    finally:
+        if fragment_rerun:
+            timings.finish()
+
+def render_results_section(timings):
+    details = get_details_html(st.session_state.selected_comp)
     st.markdown(f"""<div class='selected-card'><h2 class='selected-char'>{st.session_state.selected_comp}</h2><p class='details'>{details}</p></div>""", unsafe_allow_html=True)
 
-    related = component_map.get(st.session_state.selected_comp, {}).get("related_characters", [])
-    filtered_chars = [
-        c for c in related
-        if isinstance(c, str) and len(c) == 1 and
-        (st.session_state.selected_idc == "No Filter" or component_map.get(c, {}).get("meta", {}).get("decomposition", "").startswith(st.session_state.selected_idc)) and
-        (st.session_state.output_radical == "No Filter" or component_map.get(c, {}).get("meta", {}).get("radical", "") == st.session_state.output_radical)
-    ]
+    if st.session_state.client_filtering:
+        render_client_results(timings)
+        return
 
-    char_compounds = {
-        c: [] if st.session_state.display_mode == "Single Character" else [
-            comp for comp in component_map.get(c, {}).get("meta", {}).get("compounds", [])
-            if len(comp) == int(st.session_state.display_mode[0])
-        ]
-        for c in filtered_chars
-    }
-    filtered_chars = [c for c in filtered_chars if st.session_state.display_mode == "Single Character" or char_compounds[c]]
+    length = phrase_length(st.session_state.display_mode)
+    with timings.span("results"):
+        result_ids, result_compounds = get_results(st.session_state.selected_comp)
+        filtered_chars = column_store.to_chars(result_ids)
+
+    with timings.span("output_select"):
+        render_output_select(filtered_chars)
+
+    st.markdown(f"<h2 class='results-header'>🧬 Results for {format_component_query(st.session_state.selected_comp)} — {len(filtered_chars)} result(s)</h2>", unsafe_allow_html=True)
+    col_order, col_size, col_mode = st.columns([0.34, 0.33, 0.33])
+    with col_order:
+        st.selectbox("Sort results by:", ["Strokes", "Most phrases"], key=widget_key("result_order"),
+                     on_change=on_widget_change, args=("result_order",))
+    with col_size:
+        st.selectbox("Results per page:", [25, 50, 100, 200], key=widget_key("page_size"),
+                     on_change=on_widget_change, args=("page_size",))
+    with col_mode:
+        st.radio("Pagination:", ["Pages", "Load more"], key=widget_key("pagination_mode"), horizontal=True,
+                 on_change=on_widget_change, args=("pagination_mode",))
+    with timings.span("cards"):
+        render_results(filtered_chars)
+    with timings.span("prefetch"):
+        schedule_prefetch(st.session_state.selected_comp, result_ids)
 
     if filtered_chars:
-        # Add components from the selected character's decomposition to output options
-        selected_char_components = get_all_components(st.session_state.selected_comp, max_depth=5) if st.session_state.selected_comp else set()
-        output_options = sorted(filtered_chars, key=lambda c: get_stroke_count(c) or 0)
-        output_options.extend([comp for comp in selected_char_components if comp not in output_options and comp in component_map])
-        options = ["Select a character..."] + sorted(output_options, key=lambda c: get_stroke_count(c) or 0)
-        if (st.session_state.previous_selected_comp and
-                st.session_state.previous_selected_comp != st.session_state.selected_comp and
-                st.session_state.previous_selected_comp not in output_options and
-                st.session_state.previous_selected_comp in component_map):
-            options.insert(1, st.session_state.previous_selected_comp)
-        st.selectbox(
-            "Select a character from the list below:",
-            options=options,
-            key="output_char_select",
-            on_change=on_output_char_select,
-            args=(component_map,),
-            format_func=lambda c: (
-                c if c == "Select a character..." else
-                f"{c} (Pinyin: {clean_field(component_map.get(c, {}).get('meta', {}).get('pinyin', '—'))}, "
-                f"Strokes: {get_stroke_count(c) or 'unknown'}, "
-                f"Radical: {clean_field(component_map.get(c, {}).get('meta', {}).get('radical', '—'))}, "
-                f"Decomposition: {format_decomposition(c)}, "
-                f"Definition: {clean_field(component_map.get(c, {}).get('meta', {}).get('definition', 'No definition available'))}, "
-                f"Etymology: {get_etymology_text(component_map.get(c, {}).get('meta', {}))})"
-            )
-        )
+        with timings.span("export"), st.expander("Export Compounds"):
+            rows = len(result_compounds) if length else len(filtered_chars)
+            st.caption(f"Download all {rows} row(s) across every page: character, compound, pinyin and definition.")
+            col_format, col_download = st.columns([0.3, 0.7])
+            with col_format:
+                st.radio("Format:", list(EXPORT_FORMATS), key="export_format", horizontal=True)
+            extension, mime = EXPORT_FORMATS[st.session_state.export_format]
+            with col_download:
+                st.download_button(
+                    "Download",
+                    data=export_file(result_ids, length, st.session_state.export_format),
+                    file_name=f"radix_{st.session_state.selected_comp}_{st.session_state.display_mode.split()[0].lower()}.{extension}",
+                    mime=mime,
+                    on_click="ignore",
+                    key="export_download"
+                )
 
-    st.markdown(f"<h2 class='results-header'>🧬 Results for {st.session_state.selected_comp} — {len(filtered_chars)} result(s)</h2>", unsafe_allow_html=True)
-    for char in sorted(filtered_chars, key=lambda c: get_stroke_count(c) or 0):
-        render_char_card(char, char_compounds.get(char, []))
-
-    if filtered_chars and st.session_state.display_mode != "Single Character":
-        with st.expander("Export Compounds"):
-            st.caption("Copy this text to get pinyin and meanings for the displayed compounds.")
-            export_text = "Give me the hanyu pinyin and meaning of each compound phrase in one line a phrase in a downloadable word file\n\n"
-            export_text += "\n".join(
-                compound
-                for char in filtered_chars
-                for compound in char_compounds.get(char, [])
-            )
-            st.text_area("Export Text", export_text, height=200, key="export_text")
-            components.html(f"""
-                <textarea id="copyTarget" style="opacity:0;position:absolute;left:-9999px;">{export_text}</textarea>
-                <script>
-                const copyText = document.getElementById("copyTarget");
-                copyText.select();
-                document.execCommand("copy");
-                </script>
-            """, height=0)
-
-    # Render debug information, font slider, and diagnostics
-    radicals = {c for c in component_map if component_map.get(c, {}).get("meta", {}).get("radical", "") == c}
+def render_client_results(timings):
+    """Candidates for the browser to filter; output filters there cause no rerun at all."""
+    with timings.span("output_select"):
+        render_output_select(column_store.to_chars(column_store.sort_by_strokes(get_result_candidates(st.session_state.selected_comp))))
+    query = current_query(st.session_state.selected_comp)
+    page_size, font_scale = st.session_state.page_size, st.session_state.font_scale
+    with timings.span("cards"):
+        # An unchanged page is re-sent as a hash reference by Streamlit's message cache
+        html = result_cache.get_or_compute(client_cache_key(query, page_size, font_scale),
+                                           lambda: client_page(query, page_size, font_scale))
+        components.html(html, height=CLIENT_FILTER_HEIGHT, scrolling=True)
+
+# Relationships between characters
+SIBLING_LIMIT = 100
+
+def format_path(path):
+    """想 ⊃ 相 ⊂ 箱: ⊃ steps down into a component, ⊂ up into a character containing it."""
+    return " ".join(f"{'⊃' if direction == DOWN else '⊂'} {char}" if direction else char for char, direction in path)
+
+def render_relations(comp):
+    col_other, col_shared = st.columns([0.5, 0.5])
+    with col_other:
+        st.text_input("Compare with another character:", key="relation_char", max_chars=1, placeholder="e.g. 想")
+    with col_shared:
+        st.selectbox("Siblings share at least:", [1, 2, 3, 4], key="sibling_min_shared",
+                     format_func=lambda n: f"{n} component{'s' if n != 1 else ''}")
+    other = st.session_state.relation_char.strip()
+    if other and other not in component_map:
+        st.warning(f"'{other}' is not in the component map.")
+    elif other:
+        path = engine.decomposition_path(comp, other)
+        st.markdown(f"**Decomposition path:** {format_path(path)}" if path
+                    else f"No chain of decompositions connects {comp} and {other}.")
+        common = engine.common_components(comp, other)
+        st.markdown("**Lowest shared components:** " + (", ".join(
+            f"{c} (depth {a} in {comp}, {b} in {other})" for c, a, b in common) or "none"))
+    ids, shared = engine.siblings(comp, st.session_state.sibling_min_shared, st.session_state.containment_depth)
+    st.markdown(f"**Siblings:** {len(ids)} character(s) share at least {st.session_state.sibling_min_shared} "
+                f"of {comp}'s components" + (f", the first {SIBLING_LIMIT} shown" if len(ids) > SIBLING_LIMIT else ""))
+    if len(ids):
+        siblings = column_store.to_chars(ids[:SIBLING_LIMIT])
+        st.markdown(" ".join(f"{char}<sub>{n}</sub>" for char, n in zip(siblings, shared[:SIBLING_LIMIT].tolist())),
+                    unsafe_allow_html=True)
+
+# Debug panel
+def render_debug_panel():
+    """Font slider, state, timings, caches and diagnostics; rendered after main so the
+    current rerun's timings and profile are included."""
+    radicals = facet_index["self_radicals"]
     with st.expander("Debug Information (For Developers)", expanded=False):
         st.markdown("<div class='debug-section'>", unsafe_allow_html=True)
         st.slider("Adjust Font Size:", 0.7, 1.3, st.session_state.font_scale, 0.1, key="font_scale")
@@ -627,12 +1053,87 @@ def main():
         st.write(f"Current radical: {st.session_state.radical}")
         st.write(f"Current component_idc: {st.session_state.component_idc}")
         st.write(f"Font scale: {st.session_state.font_scale}")
-        st.write(f"Debug log: {st.session_state.debug_info}")
-        st.markdown("### Errors and Warnings")
+        st.markdown("### Rerun Timings")
+        summary = st.session_state.rerun_timings.summary()
+        if summary:
+            st.table({
+                "stage": list(summary),
+                "runs": [t["runs"] for t in summary.values()],
+                "last ms": [f"{t['last'] * 1000:.1f}" for t in summary.values()],
+                "p50 ms": [f"{t['p50'] * 1000:.1f}" for t in summary.values()],
+                "p95 ms": [f"{t['p95'] * 1000:.1f}" for t in summary.values()],
+            })
+        st.caption(f"Rolling window of the last {TIMING_WINDOW} reruns in this session.")
+        st.button("Profile next rerun", on_click=request_profile, help="Runs the next rerun under cProfile")
+        if st.session_state.last_profile:
+            st.text(st.session_state.last_profile)
+        st.markdown("### Debug Log")
+        st.text("\n".join(list(st.session_state.debug_log)[-20:]) or "—")
+        stats = result_cache.stats()
+        st.markdown("### Result Cache")
+        st.write(
+            f"{stats['entries']} entries ({stats['bytes'] / 1024:.0f} KiB of {RESULT_CACHE_MAX_BYTES / 1024:.0f} KiB), "
+            f"hits: {stats['hits']}, misses: {stats['misses']} (hit rate {stats['hit_rate']:.0%}), "
+            f"evictions: {stats['evictions']}, expirations: {stats['expirations']}"
+        )
+        stats = prefetcher.stats()
+        st.markdown("### Prefetch")
+        st.write(
+            f"Hit rate {stats['hit_rate']:.0%} ({stats['hits']} of {stats['lookups']} new queries were prefetched), "
+            f"submitted: {stats['submitted']}, completed: {stats['completed']}, cancelled: {stats['cancelled']}, "
+            f"dropped: {stats['dropped']}, failed: {stats['failed']}, pending: {stats['pending']}"
+        )
+        stats = prefetch_cache.stats()
+        st.write(
+            f"Prefetch cache: {stats['entries']} entries ({stats['bytes'] / 1024:.0f} KiB of "
+            f"{PREFETCH_CACHE_MAX_BYTES / 1024:.0f} KiB), evictions: {stats['evictions']}"
+        )
+        st.markdown("### Load Diagnostics")
+        st.write(
+            f"Loaded {load_report['entries']} entries from {load_report['source']} "
+            f"in {load_report['load_seconds']:.2f}s at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(load_report['loaded_at']))}"
+        )
+        if engine.lazy_text:
+            labels, cards = engine.cached_label.cache_info(), engine.cached_labels.cache_info()
+            st.write(f"Definitions, etymology and compounds are read from the artifact on demand; "
+                     f"{labels.currsize} of at most {labels.maxsize} dropdown labels cached (hits: {labels.hits}, misses: {labels.misses}), "
+                     f"{cards.currsize} of at most {cards.maxsize} card details cached (hits: {cards.hits}, misses: {cards.misses}).")
+        if snapshot.version:
+            st.write(f"Data version {snapshot.version}; the file is checked for changes every {HOT_RELOAD_INTERVAL:g}s.")
+            for event in get_live_data().events:
+                when = time.strftime('%H:%M:%S', time.localtime(event['at']))
+                if event["mode"] == "error":
+                    st.markdown(f"<p class='diagnostic-message error'>Reload failed at {when}: {event['error']}</p>", unsafe_allow_html=True)
+                else:
+                    st.write(f"{when}: {event['mode']} reload, {event['changed']} changed entries in {event['seconds']:.2f}s")
+        for msg in load_report["messages"]:
+            class_name = 'error' if msg['type'] == 'error' else 'warning'
+            st.markdown(f"<p class='diagnostic-message {class_name}'>{msg['type'].capitalize()}: {msg['message']}</p>", unsafe_allow_html=True)
+        for label, key in (("Decomposition cycles", "cycles"), ("Malformed decompositions", "malformed"), ("Components missing from the map", "missing")):
+            found = decomposition_index[key]
+            if found:
+                st.markdown(f"<p class='diagnostic-message warning'>{label} ({len(found)}): {', '.join(found[:20])}{' …' if len(found) > 20 else ''}</p>", unsafe_allow_html=True)
+        st.markdown(f"### Errors and Warnings (last {DIAGNOSTIC_BUFFER_SIZE})")
         for msg in st.session_state.diagnostic_messages:
             class_name = 'error' if msg['type'] == 'error' else 'warning'
             st.markdown(f"<p class='diagnostic-message {class_name}'>{msg['type'].capitalize()}: {msg['message']}</p>", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
+def run():
+    timings = st.session_state.rerun_timings
+    timings.start()
+    try:
+        with timings.span("total"):
+            if st.session_state.profile_requested:
+                st.session_state.profile_requested = False
+                _, st.session_state.last_profile = profile_call(main)
+            else:
+                main()
+    finally:
+        # A fragment rerun finds current None and times itself
+        timings.finish()
+    if component_map:
+        render_debug_panel()
+
 if __name__ == "__main__":
-    main()
+    run()
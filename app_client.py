@@ -0,0 +1,162 @@
+"""Drive the app as a browser does, over its websocket.
+
+start_server runs app2.py with `streamlit run` on a free port. A Session opens the
+app's websocket and speaks the browser's protocol: it sends rerun requests with
+widget states and waits for the script_finished message. It also reports the hashes
+of cached messages so the server can send references, as a browser does. Widgets are
+found by their key, and widgets inside a fragment send fragment reruns.
+
+Used by the load test, the payload benchmark and the fragment tests. Nothing here
+imports the app.
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app2.py")
+FINAL_STATUSES = {
+    ForwardMsg.FINISHED_SUCCESSFULLY,
+    ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY,
+    ForwardMsg.FINISHED_WITH_COMPILE_ERROR,
+}
+
+# Server process
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(workdir, port, timeout):
+    log = open(os.path.join(workdir, "server.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP, "--server.headless", "true",
+         "--server.port", str(port), "--server.address", "127.0.0.1",
+         "--browser.gatherUsageStats", "false", "--server.fileWatcherType", "none"],
+        cwd=workdir, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"streamlit exited with code {process.returncode}; see {log.name}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"streamlit did not become healthy within {timeout}s")
+
+# Simulated browser
+class Session:
+    def __init__(self, url, timeout, fragment_reruns=True):
+        """fragment_reruns=False sends every widget change as a full rerun, for comparison."""
+        self.url = url
+        self.timeout = timeout
+        self.fragment_reruns = fragment_reruns
+        self.websocket = None
+        self.cache = {}
+        self.widgets = {}
+        self.fragments = {}
+        self.latencies = []
+        self.received = []  # (action, websocket bytes received) per rerun
+        self.errors = []
+
+    async def connect(self):
+        self.websocket = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+
+    def widget(self, key):
+        """(id, element type, element proto) of the widget with user key or label `key`, or None."""
+        for widget_id, found in self.widgets.items():
+            if widget_id.endswith(f"-{key}") or found[1].label == key:
+                return (widget_id,) + found
+        return None
+
+    async def rerun(self, action, widget_states=(), fragment_id=""):
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.widget_states.widgets.extend(widget_states)
+        state.fragment_id = fragment_id
+        state.cached_message_hashes.extend(self.cache)
+        started = time.perf_counter()
+        await self.websocket.send(msg.SerializeToString())
+        full_run = not fragment_id
+        if full_run:
+            self.widgets, self.fragments = {}, {}
+        received = 0
+        while True:
+            data = await asyncio.wait_for(self.websocket.recv(), self.timeout)
+            received += len(data)
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            if forward.WhichOneof("type") == "ref_hash":
+                forward = self.cache.get(forward.ref_hash, forward)
+            elif forward.metadata.cacheable:
+                self.cache[forward.hash] = forward
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                self.record_element(forward.delta)
+            elif kind == "script_finished":
+                if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    # A callback or st.rerun() started a full run; widgets are replaced
+                    self.widgets, self.fragments = {}, {}
+                elif forward.script_finished in FINAL_STATUSES:
+                    break
+        self.latencies.append((action, time.perf_counter() - started))
+        self.received.append((action, received))
+
+    def record_element(self, delta):
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            self.errors.append(element.exception.message)
+            return
+        proto = getattr(element, kind, None)
+        widget_id = getattr(proto, "id", "")
+        if widget_id and widget_id.startswith("$$ID"):
+            self.widgets[widget_id] = (kind, proto)
+            self.fragments[widget_id] = delta.fragment_id
+
+    def fragment_of(self, widget_id):
+        return self.fragments.get(widget_id, "") if self.fragment_reruns else ""
+
+    async def set_option(self, action, key, choose):
+        """Select choose(options) in a selectbox or radio; False if the widget is missing."""
+        found = self.widget(key)
+        if found is None or not found[2].options:
+            return False
+        widget_id, _, proto = found
+        state = WidgetState(id=widget_id)
+        state.string_value = choose(list(proto.options))
+        await self.rerun(action, [state], self.fragment_of(widget_id))
+        return True
+
+    async def set_value(self, action, key, **value):
+        """Set a widget's state directly, e.g. bool_value=True for a toggle; False if missing."""
+        found = self.widget(key)
+        if found is None:
+            return False
+        widget_id = found[0]
+        await self.rerun(action, [WidgetState(id=widget_id, **value)], self.fragment_of(widget_id))
+        return True
+
+    async def click(self, action, key):
+        found = self.widget(key)
+        if found is None or found[2].disabled:
+            return False
+        widget_id = found[0]
+        await self.rerun(action, [WidgetState(id=widget_id, trigger_value=True)], self.fragment_of(widget_id))
+        return True
@@ -0,0 +1,79 @@
+"""Compare the dict-comprehension filters with the NumPy ColumnStore.
+
+    python benchmarks/bench_filter_engine.py [--sizes 10000 100000 1000000] [--repeat 5]
+
+Each size builds a synthetic component map, then times the same three operations both
+ways: the input filter (strokes + radical + IDC over every entry, sorted by strokes), the
+output filter (IDC + radical over a 5% candidate list), and the Result IDC/Radical option
+lists for that candidate list.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compiled_store import normalize_strokes  # noqa: E402
+from filter_engine import ColumnStore, IDC_CODES  # noqa: E402
+from synthetic_data import generate_component_map  # noqa: E402
+
+def get_stroke_count(component_map, char):
+    return normalize_strokes(component_map.get(char, {}).get("meta", {}).get("strokes")) or None
+
+def comprehension_filters(component_map, candidates, stroke_count, radical, idc):
+    filtered = sorted((
+        comp for comp in component_map
+        if isinstance(comp, str) and len(comp) == 1 and
+        (stroke_count == 0 or get_stroke_count(component_map, comp) == stroke_count) and
+        (radical == "No Filter" or component_map.get(comp, {}).get("meta", {}).get("radical", "") == radical) and
+        (idc == "No Filter" or component_map.get(comp, {}).get("meta", {}).get("decomposition", "").startswith(idc))
+    ), key=lambda c: get_stroke_count(component_map, c) or 0)
+    output = [
+        c for c in candidates
+        if (idc == "No Filter" or component_map.get(c, {}).get("meta", {}).get("decomposition", "").startswith(idc)) and
+        (radical == "No Filter" or component_map.get(c, {}).get("meta", {}).get("radical", "") == radical)
+    ]
+    idc_options = sorted({d[0] for d in (component_map[c]["meta"]["decomposition"] for c in candidates)
+                          if d and d[0] in IDC_CODES})
+    radical_options = sorted({component_map[c]["meta"]["radical"] for c in candidates})
+    return len(filtered), len(output), idc_options, radical_options
+
+def columnar_filters(store, candidate_ids, stroke_count, radical, idc):
+    import numpy as np
+    filtered = store.sort_by_strokes(np.flatnonzero(store.mask(stroke_count, radical, idc)))
+    output = store.select(candidate_ids, radical=radical, idc=idc)
+    return len(filtered), len(output), store.idc_options(candidate_ids), store.radical_options(candidate_ids)
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'entries':>10} {'build s':>9} {'dicts ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        component_map = generate_component_map(size)
+        chars = list(component_map)
+        started = time.perf_counter()
+        store = ColumnStore.from_component_map(component_map, chars)
+        build = time.perf_counter() - started
+        candidates = chars[::20]
+        candidate_ids = store.ids_of(candidates)
+        query = (7, component_map[chars[0]]["meta"]["radical"], "⿰")
+        slow, slow_result = best_of(args.repeat, comprehension_filters, component_map, candidates, *query)
+        fast, fast_result = best_of(args.repeat, columnar_filters, store, candidate_ids, *query)
+        assert slow_result == fast_result, (slow_result, fast_result)
+        print(f"{size:>10} {build:>9.2f} {slow * 1000:>10.2f} {fast * 1000:>10.2f} {slow / fast:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
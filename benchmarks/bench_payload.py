@@ -0,0 +1,131 @@
+"""Bytes sent per interaction by full reruns and by results-panel fragment reruns.
+
+    python benchmarks/bench_payload.py --size 10000 -o payload.json
+    python benchmarks/bench_payload.py --data enhanced_component_map_with_etymology.json
+
+The app is started with `streamlit run`, and two simulated browsers from app_client.py
+replay the same results-panel interactions over its websocket. One sends each change
+as a fragment rerun, as a browser does for widgets inside the panel; the other sends
+the same change as a full rerun. Both report their cached message hashes, so the
+server sends references for elements the browser already holds. The numbers are the
+websocket bytes each browser received for the rerun.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+
+import query_engine  # noqa: E402
+from app_client import Session, free_port, start_server  # noqa: E402
+from synthetic_data import generate_component_map, write_component_map  # noqa: E402
+
+def first_option(skip="No Filter"):
+    """Chooser for the first option other than skip."""
+    def choose(options):
+        return next((label for label in options if label != skip and not label.startswith(skip)), options[0])
+    return choose
+
+def interactions():
+    """(name, step) pairs; each step changes one results-panel widget of a session."""
+    yield "Next page", lambda s: s.click("Next page", "page_next")
+    yield "Result IDC", lambda s: s.set_option("Result IDC", "selected_idc_widget", first_option())
+    yield "Result Radical", lambda s: s.set_option("Result Radical", "output_radical_widget", first_option())
+    yield "Output Type", lambda s: s.set_option("Output Type", "display_mode_widget", lambda options: "2-Character Phrases")
+    yield "Sort results", lambda s: s.set_option("Sort results", "result_order_widget", lambda options: "Most phrases")
+    yield "Clear Result IDC", lambda s: s.set_option("Clear Result IDC", "selected_idc_widget", lambda options: "No Filter")
+
+def busiest_component(path):
+    data, _ = query_engine.load_data(path)
+    engine = query_engine.QueryEngine(data)
+    containers = np.diff(np.frombuffer(engine.containment_index["offsets"], dtype=np.uint32).astype(np.int64))
+    return engine.decomposition_index["chars"][int(np.argmax(containers))]
+
+async def open_session(url, args, component, fragment_reruns):
+    """A session showing component's single-character results, unfiltered, at the
+    benchmark's page size. The app opens on a random example, so the filters are reset."""
+    session = Session(url, args.timeout, fragment_reruns)
+    await session.connect()
+    await session.rerun("open")
+    await session.click("reset filters", "Reset Filters")
+    steps = [
+        ("selected_comp", lambda options: next(o for o in options if o.split(" ")[0] == component)),
+        ("display_mode_widget", lambda options: "Single Character"),
+        ("page_size_widget", lambda options: str(args.page_size)),
+    ]
+    for key, choose in steps:
+        if not await session.set_option("setup", key, choose):
+            raise RuntimeError(f"could not set {key} for {component}")
+    return session
+
+async def run_benchmark(url, args, component):
+    fragment = await open_session(url, args, component, fragment_reruns=True)
+    full = await open_session(url, args, component, fragment_reruns=False)
+    rows = []
+    try:
+        for name, step in interactions():
+            if not await step(fragment) or not await step(full):
+                print(f"skipping {name}: widget not shown", file=sys.stderr)
+                continue
+            full_bytes, fragment_bytes = full.received[-1][1], fragment.received[-1][1]
+            rows.append({"interaction": name, "full_bytes": full_bytes, "fragment_bytes": fragment_bytes,
+                         "saved_bytes": full_bytes - fragment_bytes,
+                         "full_rerun_seconds": full.latencies[-1][1],
+                         "fragment_rerun_seconds": fragment.latencies[-1][1]})
+            print(f"{name:<18} full {full_bytes:>9} B  fragment {fragment_bytes:>9} B  "
+                  f"saved {full_bytes - fragment_bytes:>9} B ({(full_bytes - fragment_bytes) / max(full_bytes, 1):.0%})",
+                  file=sys.stderr)
+    finally:
+        await fragment.close()
+        await full.close()
+    errors = fragment.errors + full.errors
+    if errors:
+        raise RuntimeError(errors[0])
+    return {"component": component, "initial_bytes": full.received[0][1], "interactions": rows}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", help="component map JSON (default: a synthetic map of --size)")
+    parser.add_argument("--size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--component", help="input component (default: the one contained by the most characters)")
+    parser.add_argument("--page-size", type=int, default=50, choices=[25, 50, 100, 200])
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("-o", "--output", help="JSON results file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        target = os.path.join(workdir, query_engine.DATA_FILE)
+        if args.data:
+            os.symlink(os.path.abspath(args.data), target)
+        else:
+            write_component_map(target, generate_component_map(args.size, seed=args.seed))
+        component = args.component or busiest_component(target)
+        port = free_port()
+        process = start_server(workdir, port, args.timeout)
+        try:
+            result = asyncio.run(run_benchmark(f"ws://127.0.0.1:{port}/_stcore/stream", args, component))
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+    report = {
+        "benchmark": "payload",
+        "parameters": {k: v for k, v in vars(args).items() if k != "output"},
+        **result,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Time each stage of the query pipeline on synthetic data and write the results as JSON.
+
+    python benchmarks/bench_pipeline.py --sizes 10000 100000 --depth 3 --compounds 4 -o bench.json
+
+For every size a synthetic map is written to a temporary JSON file, then each stage is
+run --repeat times and the best time is kept. Closures are read for --queries random
+characters; results, compounds and cards are built for the --queries most-contained
+components, which are the heaviest queries. The JSON output records the parameters, the environment and, per size and
+stage, the best and all timings in seconds, so runs can be compared over time.
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+
+import query_engine  # noqa: E402
+from compiled_store import compile_artifact, open_artifact  # noqa: E402
+from filter_engine import NO_FILTER, ColumnStore  # noqa: E402
+from synthetic_data import generate_component_map, write_component_map  # noqa: E402
+
+PAGE_SIZE = 50
+
+def best_of(repeat, func, *args):
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - started)
+    return timings, result
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def load_artifact(path):
+    store, reason = open_artifact(path)
+    if store is None:
+        raise RuntimeError(reason)
+    try:
+        return store.to_component_map()
+    finally:
+        store.close()
+
+def facet_options(component_map):
+    facets = query_engine.build_facet_index(component_map)
+    options = 0
+    for strokes in [0] + facets["stroke_options"]:
+        radicals = facets["radical_options"].get(strokes, [])
+        options += len(radicals)
+        for radical in [NO_FILTER] + radicals:
+            options += len(facets["idc_options"].get((strokes, radical), []))
+    return options
+
+def all_components(engine, chars):
+    return sum(len(engine.get_all_components(char, max_depth=5)) for char in chars)
+
+def filter_results(engine, comps):
+    return [engine.results(comp, depth=0)[0] for comp in comps]
+
+def select_compounds(engine, results):
+    chars = engine.column_store.to_chars
+    return sum(len(engine.get_compounds(char, length)) for ids in results for char in chars(ids) for length in (2, 3, 4))
+
+def format_labels(engine):
+    return sum(len(engine.format_labels(char)[0]) for char in engine.component_map)
+
+def card_html(engine, details, results):
+    size = 0
+    for ids in results:
+        for char in engine.column_store.to_chars(ids[:PAGE_SIZE]):
+            size += len(query_engine.format_char_card(
+                char, details[char], engine.get_phrase_count(char, 2), engine.get_compounds(char, 2),
+                f"2-Character Phrases for {char}:"
+            ))
+    return size
+
+def run_size(size, args, workdir):
+    component_map = generate_component_map(size, args.depth, args.compounds, args.invalid, args.seed)
+    path = os.path.join(workdir, f"map_{size}.json")
+    write_component_map(path, component_map)
+    del component_map
+    stages, counts = {}, {"file_bytes": os.path.getsize(path)}
+
+    def stage(name, func, *stage_args):
+        timings, result = best_of(args.repeat, func, *stage_args)
+        stages[name] = {"best": min(timings), "all": timings}
+        print(f"{size:>10} {name:<22} {min(timings) * 1000:>10.2f} ms", file=sys.stderr)
+        return result
+
+    raw = stage("load_json", load_json, path)
+    cleaned = [copy.deepcopy(raw) for _ in range(args.repeat)]
+    messages = stage("clean_decompositions", lambda: query_engine.clean_decompositions(cleaned.pop()))
+    counts["invalid_decompositions"] = len(messages)
+    query_engine.clean_decompositions(raw)
+    component_map = stage("freeze", query_engine.freeze, raw)
+    del raw
+    compile_artifact(path)
+    stage("load_artifact", load_artifact, path)
+
+    counts["facet_options"] = stage("facet_options", facet_options, component_map)
+    decomposition_index = stage("decomposition_index", query_engine.build_decomposition_index, component_map)
+    stage("containment_index", query_engine.build_containment_index, decomposition_index)
+    stage("position_index", query_engine.build_position_index, decomposition_index)
+    stage("column_store", ColumnStore.from_component_map, component_map, decomposition_index["chars"])
+    stage("compound_index", query_engine.build_compound_index, component_map, decomposition_index)
+    engine = query_engine.QueryEngine(component_map)
+
+    rng = random.Random(args.seed)
+    chars = list(component_map)
+    sample = rng.sample(chars, min(args.queries, len(chars)))
+    # Popular components: the ones contained by the most characters
+    containers = np.diff(np.frombuffer(engine.containment_index["offsets"], dtype=np.uint32).astype(np.int64))
+    popular = engine.column_store.to_chars(np.argsort(-containers, kind="stable")[:args.queries])
+    counts["components_closure"] = stage("get_all_components", all_components, engine, sample)
+    results = stage("result_filtering", filter_results, engine, popular)
+    counts["results"] = int(sum(len(ids) for ids in results))
+    counts["compounds_selected"] = stage("compound_selection", select_compounds, engine, results)
+    stage("label_formatting", format_labels, engine)
+    details = {char: engine.format_labels(char)[1] for char in chars}
+    counts["card_html_bytes"] = stage("card_html", card_html, engine, details, results)
+    return {"size": size, "stages": stages, "counts": counts}
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "commit": commit,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--compounds", type=int, default=4)
+    parser.add_argument("--invalid", type=float, default=0.01, help="fraction of '?' decompositions")
+    parser.add_argument("--queries", type=int, default=200, help="components per query stage")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="JSON results file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        runs = [run_size(size, args, workdir) for size in args.sizes]
+    report = {
+        "benchmark": "pipeline",
+        "parameters": {k: v for k, v in vars(args).items() if k != "output"},
+        "environment": environment(),
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
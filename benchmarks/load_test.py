@@ -0,0 +1,209 @@
+"""Concurrent-session load test: N simulated browsers replaying click sequences.
+
+    python benchmarks/load_test.py --sessions 40 --data enhanced_component_map_with_etymology.json
+    python benchmarks/load_test.py --sessions 40 --size 20000 --ramp 2 -o load.json
+    python benchmarks/load_test.py --url ws://localhost:8501/_stcore/stream --sessions 10
+
+Unless --url is given, the app is started with `streamlit run` on a free port, in a
+temporary directory holding the data file. Each session is an app_client.Session: it
+opens the app's websocket and speaks the browser's protocol, fragment reruns included.
+
+Every session replays the same kind of sequence as a student: open the app, pick a
+component, change a filter, change the result IDC and the output type, page forward,
+click an output character and reset the filters, with --think seconds between clicks.
+Sessions start spread over --ramp seconds.
+
+The report gives rerun latency percentiles overall and per action, reruns per second,
+and the server's resident memory before, during and after the sessions (Linux, and
+only for a server started here). One untimed session opens the app first, so the
+baseline already holds the shared caches and the growth is per-session state;
+--cold measures a server that gets hit by everyone at once right after starting.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+import websockets  # noqa: E402
+
+from app_client import Session, free_port, start_server  # noqa: E402
+from query_engine import DATA_FILE  # noqa: E402
+from synthetic_data import generate_component_map, write_component_map  # noqa: E402
+
+# Server process
+def rss_bytes(pid):
+    """Resident set size of pid from /proc, or None where that is unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+# Simulated students
+async def replay(index, args, results):
+    """One student's visit: open the app and click through a typical sequence."""
+    rng = random.Random(args.seed + index)
+    await asyncio.sleep(rng.uniform(0, args.ramp))
+    session = Session(args.url, args.timeout)
+    results.append(session)
+
+    def think():
+        return asyncio.sleep(rng.expovariate(1 / args.think) if args.think > 0 else 0)
+
+    def pick(options):
+        return rng.choice(options[1:] or options)
+
+    try:
+        await session.connect()
+        await session.rerun("open")
+        await think()
+        await session.set_option("pick component", "selected_comp", pick)
+        await think()
+        await session.set_option("input filter", "stroke_count", pick)
+        await think()
+        await session.set_option("result IDC", "selected_idc_widget", pick)
+        await think()
+        await session.set_option("output type", "display_mode_widget", lambda options: rng.choice(options[1:]))
+        await think()
+        await session.click("next page", "page_next")
+        await think()
+        await session.set_option("output character", "output_char_select", pick)
+        await think()
+        await session.click("reset filters", "Reset Filters")
+    except (asyncio.TimeoutError, OSError, websockets.WebSocketException) as e:
+        session.errors.append(f"{type(e).__name__}: {e}")
+    return session
+
+async def run_sessions(args, pid):
+    results = []
+    memory = {"before": rss_bytes(pid) if pid else None, "peak": None}
+
+    async def sample_memory():
+        while pid:
+            rss = rss_bytes(pid)
+            if rss is not None:
+                memory["peak"] = max(memory["peak"] or 0, rss)
+            await asyncio.sleep(0.1)
+
+    sampler = asyncio.ensure_future(sample_memory())
+    started = time.perf_counter()
+    await asyncio.gather(*(replay(i, args, results) for i in range(args.sessions)))
+    wall = time.perf_counter() - started
+    memory["connected"] = rss_bytes(pid) if pid else None
+    await asyncio.gather(*(session.close() for session in results))
+    sampler.cancel()
+    await asyncio.sleep(args.settle)
+    memory["after_disconnect"] = rss_bytes(pid) if pid else None
+    return results, wall, memory
+
+async def warm_up(session):
+    await session.connect()
+    await session.rerun("open")
+    await session.close()
+
+# Report
+def percentiles(values):
+    if not values:
+        return None
+    p50, p90, p95, p99 = np.percentile(values, [50, 90, 95, 99])
+    return {"count": len(values), "mean": float(np.mean(values)), "p50": float(p50), "p90": float(p90),
+            "p95": float(p95), "p99": float(p99), "max": float(np.max(values))}
+
+def summarize(sessions, wall, memory):
+    latencies = [seconds for session in sessions for _, seconds in session.latencies]
+    by_action = {}
+    for session in sessions:
+        for action, seconds in session.latencies:
+            by_action.setdefault(action, []).append(seconds)
+    before, connected = memory["before"], memory["connected"]
+    return {
+        "sessions": len(sessions),
+        "wall_seconds": wall,
+        "reruns": len(latencies),
+        "reruns_per_second": len(latencies) / wall if wall else None,
+        "latency": percentiles(latencies),
+        "latency_by_action": {action: percentiles(values) for action, values in by_action.items()},
+        "memory_bytes": memory,
+        "memory_per_session_bytes": (connected - before) / len(sessions) if before and connected and sessions else None,
+        "errors": [error for session in sessions for error in session.errors][:20],
+    }
+
+def print_summary(report):
+    out = sys.stderr
+    print(f"{report['sessions']} sessions, {report['reruns']} reruns in {report['wall_seconds']:.1f}s "
+          f"({report['reruns_per_second']:.1f} reruns/s)", file=out)
+    print(f"{'action':<18} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}", file=out)
+    rows = dict(report["latency_by_action"], all=report["latency"])
+    for action, stats in rows.items():
+        if stats:
+            print(f"{action:<18} {stats['count']:>5} {stats['p50'] * 1000:>9.1f} {stats['p95'] * 1000:>9.1f} "
+                  f"{stats['p99'] * 1000:>9.1f} {stats['max'] * 1000:>9.1f}", file=out)
+    memory = report["memory_bytes"]
+    if memory["before"]:
+        print(f"server RSS: before {memory['before'] >> 20} MiB, peak {memory['peak'] >> 20} MiB, "
+              f"connected {memory['connected'] >> 20} MiB, after disconnect {memory['after_disconnect'] >> 20} MiB, "
+              f"~{report['memory_per_session_bytes'] / 1024:.0f} KiB per session", file=out)
+    if report["errors"]:
+        print(f"{len(report['errors'])} error(s), first: {report['errors'][0]}", file=out)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which sessions start")
+    parser.add_argument("--think", type=float, default=0.5, help="mean seconds between clicks (0 for none)")
+    parser.add_argument("--url", help="websocket of a running app (default: start one)")
+    parser.add_argument("--data", help="component map JSON for the started app (default: synthetic)")
+    parser.add_argument("--size", type=int, default=10_000, help="synthetic map size")
+    parser.add_argument("--cold", action="store_true",
+                        help="skip the untimed warm-up session, so the first sessions also build the shared caches")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for a rerun or the server")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to wait before the after-disconnect sample")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="JSON results file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        process = None
+        if args.url is None:
+            target = os.path.join(workdir, DATA_FILE)
+            if args.data:
+                os.symlink(os.path.abspath(args.data), target)
+            else:
+                write_component_map(target, generate_component_map(args.size, seed=args.seed))
+            port = free_port()
+            process = start_server(workdir, port, args.timeout)
+            args.url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        try:
+            if not args.cold:
+                warm = Session(args.url, args.timeout)
+                asyncio.run(warm_up(warm))
+            sessions, wall, memory = asyncio.run(run_sessions(args, process.pid if process else None))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+
+    report = {"benchmark": "load", "parameters": {k: v for k, v in vars(args).items() if k != "output"},
+              **summarize(sessions, wall, memory)}
+    print_summary(report)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if report["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Synthetic enhanced_component_map_with_etymology.json files at any scale.
+
+    python benchmarks/synthetic_data.py -n 100000 --depth 4 --compounds 6 -o /tmp/map.json
+
+The first characters are primitives that decompose to themselves. The rest are
+split into depth layers, and every character in layer L uses at least one component
+from layer L - 1, so decomposition closures really are depth levels deep. Field
+types vary the way the real file does (strokes as int, str, float or null; pinyin as
+str or list), and --invalid adds '?' decompositions for the cleaning pass.
+"""
+import argparse
+import json
+import random
+import sys
+
+IDCS_2 = "⿰⿱⿴⿵⿶⿷⿸⿹⿺⿻"
+IDCS_3 = "⿲⿳"
+PINYIN = ["mù", "xīn", "shuǐ", "kǒu", "rén", "huǒ", "tǔ", "jīn", "rì", "yuè"]
+DEFINITIONS = ["tree; wood", "heart; mind", "water", "mouth; opening", "person", "fire", "earth; soil"]
+
+def synthetic_chars(size):
+    # Consecutive code points from the CJK block upwards, skipping surrogates
+    code_points = (cp for cp in range(0x4E00, 0x110000) if not 0xD800 <= cp <= 0xDFFF)
+    return [chr(next(code_points)) for _ in range(size)]
+
+def generate_component_map(size, depth=3, compounds=4, invalid_rate=0.0, seed=0):
+    """Build a component map dict with size entries; compounds is the mean per character."""
+    rng = random.Random(seed)
+    chars = synthetic_chars(size)
+    n_primitives = min(size, max(20, size // 50))
+    layers = [chars[:n_primitives]]
+    rest = chars[n_primitives:]
+    per_layer = -(-len(rest) // depth) if rest else 0
+    for level in range(depth):
+        if rest[level * per_layer:(level + 1) * per_layer]:
+            layers.append(rest[level * per_layer:(level + 1) * per_layer])
+    radicals = layers[0][:min(len(layers[0]), 214)]
+
+    component_map = {}
+    for level, layer in enumerate(layers):
+        below = [c for lower in layers[:level] for c in lower]
+        for char in layer:
+            if level == 0:
+                decomposition = char
+            else:
+                idc = rng.choice(IDCS_3) if rng.random() < 0.1 else rng.choice(IDCS_2)
+                parts = [rng.choice(layers[level - 1])]
+                parts += [rng.choice(below) for _ in range(2 if idc in IDCS_3 else 1)]
+                rng.shuffle(parts)
+                decomposition = idc + "".join(parts)
+                if rng.random() < invalid_rate:
+                    decomposition = decomposition[:-1] + "?"
+            strokes = rng.randint(1, 30)
+            phrases = []
+            for _ in range(rng.randint(0, 2 * compounds)):
+                phrase = [rng.choice(chars) for _ in range(rng.choice((2, 2, 3, 4)) - 1)]
+                phrase.insert(rng.randrange(len(phrase) + 1), char)
+                phrases.append("".join(phrase))
+            component_map[char] = {
+                "meta": {
+                    "strokes": rng.choice([strokes, str(strokes), float(strokes), None]),
+                    "pinyin": rng.choice([rng.choice(PINYIN), rng.sample(PINYIN, 2)]),
+                    "definition": rng.choice(DEFINITIONS),
+                    "radical": char if level == 0 else rng.choice(radicals),
+                    "etymology": {"hint": rng.choice(["Pictograph", "Phono-semantic", "Ideograph"]),
+                                  "details": rng.choice(["", "Represents the thing itself"])},
+                    "decomposition": decomposition,
+                    "IDC": decomposition[0] if level else "",
+                    "compounds": phrases,
+                },
+                "related_characters": [],
+            }
+    for char, entry in component_map.items():
+        for comp in set(entry["meta"]["decomposition"]):
+            if comp in component_map and comp != char:
+                component_map[comp]["related_characters"].append(char)
+    return component_map
+
+def write_component_map(path, component_map):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(component_map, f, ensure_ascii=False)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic component map JSON file.")
+    parser.add_argument("-n", "--size", type=int, default=10_000, help="number of characters")
+    parser.add_argument("--depth", type=int, default=3, help="decomposition layers above the primitives")
+    parser.add_argument("--compounds", type=int, default=4, help="mean compounds per character")
+    parser.add_argument("--invalid", type=float, default=0.0, help="fraction of '?' decompositions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="enhanced_component_map_with_etymology.json")
+    args = parser.parse_args(argv)
+    write_component_map(args.output, generate_component_map(args.size, args.depth, args.compounds, args.invalid, args.seed))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Self-contained HTML page that filters, sorts and pages one component's results in
+the browser.
+
+The page gets QueryEngine.client_payload() for the selected component, with each
+character's card details, as one JSON blob. Result IDC, Result Radical, Output Type,
+sort order and paging then run in the iframe without a server round trip. The page
+only changes when the candidate set does, so Streamlit's message cache sends repeat
+renders as a hash reference.
+
+Nothing here imports Streamlit.
+"""
+import json
+
+TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><style>
+body { font-family: "Source Sans Pro", sans-serif; margin: 0; padding: 4px; }
+.controls { display: flex; flex-wrap: wrap; gap: 12px; margin-bottom: 10px; }
+.controls label { display: flex; flex-direction: column; font-size: 0.9em; color: #2c3e50; }
+.controls select { margin-top: 4px; padding: 4px; }
+.results-header { font-size: 1.3em; color: #2c3e50; margin: 10px 0; }
+.pager { display: flex; justify-content: space-between; align-items: center; margin: 10px 0; }
+button { background-color: #3498db; color: white; border: 0; border-radius: 5px; padding: 6px 12px; cursor: pointer; }
+button:disabled { background-color: #bdc3c7; cursor: default; }
+__CARD_CSS__
+</style></head><body>
+<div class="controls">
+  <label>Result IDC:<select id="idc"></select></label>
+  <label>Result Radical:<select id="radical"></select></label>
+  <label>Output Type:<select id="mode"></select></label>
+  <label>Sort results by:<select id="order"><option>Strokes</option><option>Most phrases</option></select></label>
+  <label>Results per page:<select id="size"><option>25</option><option>50</option><option>100</option><option>200</option></select></label>
+</div>
+<h2 class="results-header" id="header"></h2>
+<div id="cards"></div>
+<div class="pager"><button id="prev">◀ Previous</button><span id="page"></span><button id="next">Next ▶</button></div>
+<button id="download">Download CSV</button>
+<script id="payload" type="application/json">__PAYLOAD__</script>
+<script>
+const data = JSON.parse(document.getElementById("payload").textContent);
+const MODES = ["Single Character", "2-Character Phrases", "3-Character Phrases", "4-Character Phrases"];
+const $ = (id) => document.getElementById(id);
+const compounds = (i, n) => n && data.compounds[n][i] ? data.compounds[n][i].split(" ") : [];
+let page = 1;
+
+function fill(select, options, selected) {
+  select.innerHTML = "";
+  for (const [value, label] of options) select.add(new Option(label, value, false, value === selected));
+}
+
+function filtered() {
+  const idc = Number($("idc").value), radical = Number($("radical").value), n = Number($("mode").value);
+  let rows = [];
+  for (let i = 0; i < data.chars.length; i++) {
+    if (idc && data.idc[i] !== idc) continue;
+    if (radical >= 0 && data.radical[i] !== radical) continue;
+    const count = n ? compounds(i, n).length : data.phrases[i];
+    if (n && !count) continue;
+    rows.push([i, count]);
+  }
+  if ($("order").value === "Most phrases") rows.sort((a, b) => b[1] - a[1]);  // stable, strokes break ties
+  return rows;
+}
+
+function card(i, count, n) {
+  const char = data.chars[i], list = compounds(i, n);
+  let html = `<div class='char-card'><h3 class='char-title'>${char}</h3>`;
+  if (count) html += `<span class='phrase-count'>${count} phrase${count !== 1 ? "s" : ""}</span>`;
+  html += `<p class='details'>${data.details[i]}</p>`;
+  if (list.length) {
+    html += `<div class='compounds-section'><p class='compounds-title'>${MODES[n - 1]} for ${char}:</p>` +
+            `<p class='compounds-list'>${list.join(" ")}</p></div>`;
+  }
+  return html + "</div>";
+}
+
+function render() {
+  const rows = filtered(), n = Number($("mode").value), size = Number($("size").value);
+  const pages = Math.max(1, Math.ceil(rows.length / size));
+  page = Math.min(Math.max(page, 1), pages);
+  $("header").textContent = `🧬 Results for ${data.title} — ${rows.length} result(s)`;
+  $("cards").innerHTML = rows.slice((page - 1) * size, page * size).map(([i, count]) => card(i, count, n)).join("");
+  $("page").textContent = rows.length ? `Page ${page} of ${pages}` : "";
+  $("prev").disabled = page <= 1;
+  $("next").disabled = page >= pages;
+}
+
+function download() {
+  const n = Number($("mode").value), quote = (v) => /[",\\n]/.test(v) ? `"${v.replace(/"/g, '""')}"` : v;
+  const lines = ["character,compound,pinyin,definition"];
+  for (const [i] of filtered()) {
+    const row = [data.chars[i], "", data.pinyin[i], data.definition[i]];
+    if (!n) lines.push(row.map(quote).join(","));
+    for (const compound of compounds(i, n)) lines.push([row[0], compound, row[2], row[3]].map(quote).join(","));
+  }
+  const link = document.createElement("a");
+  link.href = URL.createObjectURL(new Blob([lines.join("\\n") + "\\n"], {type: "text/csv"}));
+  link.download = `radix_${data.title}_${n ? n + "-character" : "single"}.csv`;
+  link.click();
+}
+
+const present = new Set(data.idc);
+fill($("idc"), [["0", "No Filter"]].concat(
+  data.idcs.map((idc, code) => [String(code), `${idc} (${data.idc_names[idc] || idc})`]).filter(([code]) => code !== "0" && present.has(Number(code)))
+), "0");
+fill($("radical"), [["-1", "No Filter"]].concat(
+  data.radicals.map((r, i) => [String(i), r]).sort((a, b) => a[1] < b[1] ? -1 : a[1] > b[1] ? 1 : 0)
+), "-1");
+fill($("mode"), MODES.map((label, i) => [String(i ? i + 1 : 0), label]), String(data.length));
+$("order").value = data.order;
+$("size").value = String(data.page_size);
+for (const id of ["idc", "radical", "mode", "order", "size"]) $(id).addEventListener("change", () => { page = 1; render(); });
+$("prev").addEventListener("click", () => { page -= 1; render(); });
+$("next").addEventListener("click", () => { page += 1; render(); });
+$("download").addEventListener("click", download);
+render();
+</script></body></html>
+"""
+
+def client_filter_html(payload, details, title, card_css, idc_names, length=0, order="Strokes", page_size=50):
+    """The filtering page for a client_payload().
+
+    details holds (details HTML, pinyin, definition) per payload character; idc_names
+    maps IDCs to their descriptions. length, order and page_size set the initial
+    controls so the page opens on the server's current view.
+    """
+    data = dict(payload, title=title, idc_names=idc_names, length=length, order=order, page_size=page_size)
+    data["details"], data["pinyin"], data["definition"] = (list(column) for column in zip(*details)) if details else ([], [], [])
+    blob = json.dumps(data, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+    return TEMPLATE.replace("__CARD_CSS__", card_css).replace("__PAYLOAD__", blob)
@@ -0,0 +1,327 @@
+"""Compiled, memory-mapped form of enhanced_component_map_with_etymology.json.
+
+Compile once offline:
+
+    python compiled_store.py enhanced_component_map_with_etymology.json
+
+The app then maps the resulting .radix file at startup instead of parsing the JSON.
+
+Layout (native little-endian byte order, every integer is a u32):
+    header        MAGIC, version, source sha256 (32 bytes), section counts
+    offsets       n_strings + 1 byte offsets into the string blob
+    blob          UTF-8 strings, each followed by a NUL separator
+    records       n_chars records of RECORD_FIELDS u32 values
+    pool          string IDs referenced by the compounds/related_characters ranges
+    messages      (type ID, message ID) pairs recorded while compiling
+
+Character keys are written first to the string table, so a character's string ID
+is also its integer character ID. Each record also holds the character's compound
+counts by phrase length, so a lazy map can be indexed without decoding its text. Radicals, IDCs and other repeated text are
+interned: each distinct string is stored once.
+
+to_component_map(lazy_text=True) keeps only the structural fields resident. The
+definition, etymology and compounds of a character are read from the mapping when
+first asked for, through a bounded LRU, and the mapping stays open for the life of
+the map. Mapped pages are shared by every process that maps the file, and the
+kernel can drop them under memory pressure.
+"""
+import argparse
+import gc
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from functools import lru_cache
+from types import MappingProxyType
+
+MAGIC = b"RADIX\x00\x00\x01"
+VERSION = 2
+HEADER = struct.Struct("<8sI32sIIII")
+MISSING = 0xFFFFFFFF
+EMPTY = MappingProxyType({})
+
+# Per-character record: normalized strokes, then string IDs, then pool ranges, then
+# the number of compounds of each PHRASE_LENGTHS length
+TEXT_FIELDS = ("pinyin", "definition", "radical", "decomposition", "IDC")
+ETYMOLOGY_FIELDS = ("hint", "details")
+PHRASE_LENGTHS = (2, 3, 4)
+COUNTS_AT = 1 + len(TEXT_FIELDS) + len(ETYMOLOGY_FIELDS) + 4
+RECORD_FIELDS = COUNTS_AT + len(PHRASE_LENGTHS)
+# Fields a lazy map reads from the mapping on demand
+LAZY_FIELDS = ("definition", "etymology", "compounds")
+TEXT_CACHE_SIZE = 4096  # characters whose lazy fields are kept decoded
+
+def artifact_path_for(source_path):
+    return os.path.splitext(source_path)[0] + ".radix"
+
+def source_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+def normalize_strokes(strokes):
+    """Mirror get_stroke_count: positive int/float or digit string, else 0 (unknown)."""
+    if isinstance(strokes, bool):
+        return 0
+    if isinstance(strokes, (int, float)) and strokes > 0:
+        return int(strokes)
+    if isinstance(strokes, str) and strokes.isdigit():
+        return int(strokes)
+    return 0
+
+def normalize_text(value):
+    """Collapse a field to one string the way clean_field reads it; None means absent."""
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        return normalize_text(value[0]) if value else ""
+    return value if isinstance(value, str) else str(value)
+
+# Compile
+def compile_artifact(source_path, output_path=None, drop_related=False):
+    output_path = output_path or artifact_path_for(source_path)
+    with open(source_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    strings, string_ids = [], {}
+
+    def intern(value):
+        if value is None:
+            return MISSING
+        if "\x00" in value:
+            raise ValueError(f"NUL character in string {value!r}")
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    for char in data:
+        intern(char)
+
+    records, pool, messages = [], [], []
+    for char, entry in data.items():
+        meta = entry.get("meta", {}) or {}
+        decomposition = normalize_text(meta.get("decomposition"))
+        if decomposition and '?' in decomposition:
+            messages.append(("warning", f"Invalid component '?' in decomposition for {char}: {decomposition}"))
+            decomposition = ""
+        fields = dict(meta, decomposition=decomposition) if "decomposition" in meta else meta
+        etymology = meta.get("etymology", {}) or {}
+        record = [normalize_strokes(meta.get("strokes"))]
+        record += [intern(normalize_text(fields.get(name))) for name in TEXT_FIELDS]
+        record += [intern(normalize_text(etymology.get(name))) for name in ETYMOLOGY_FIELDS]
+        compounds = [normalize_text(item) for item in meta.get("compounds", []) or []]
+        related = [] if drop_related else entry.get("related_characters", []) or []
+        for items in (compounds, [normalize_text(item) for item in related]):
+            start = len(pool)
+            pool.extend(intern(item) for item in items)
+            record += [start, len(pool)]
+        lengths = [len(item) for item in compounds if item is not None]
+        record += [lengths.count(n) for n in PHRASE_LENGTHS]
+        records.append(record)
+
+    message_ids = [intern(part) for message in messages for part in message]
+    encoded = [s.encode("utf-8") + b"\x00" for s in strings]
+    offsets, position = [], 0
+    for chunk in encoded:
+        offsets.append(position)
+        position += len(chunk)
+    offsets.append(position)
+
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, VERSION, source_digest(source_path),
+                              len(strings), len(records), len(pool), len(messages)))
+        out.write(array("I", offsets).tobytes())
+        out.write(b"".join(encoded))
+        out.write(b"\x00" * (-out.tell() % 4))
+        out.write(array("I", (value for record in records for value in record)).tobytes())
+        out.write(array("I", pool).tobytes())
+        out.write(array("I", message_ids).tobytes())
+    os.replace(tmp_path, output_path)
+    return {"output": output_path, "characters": len(records), "strings": len(strings),
+            "bytes": os.path.getsize(output_path), "messages": len(messages)}
+
+# Load
+class LazyMeta(Mapping):
+    """A character's meta: structural fields held in memory, LAZY_FIELDS fetched from the store."""
+    __slots__ = ("_resident", "_store", "_id")
+
+    def __init__(self, resident, store, char_id):
+        self._resident = resident
+        self._store = store
+        self._id = char_id
+
+    def __getitem__(self, key):
+        if key in LAZY_FIELDS:
+            return self._store.lazy_fields(self._id)[key]
+        return self._resident[key]
+
+    def __iter__(self):
+        yield from self._resident
+        yield from self._store.lazy_fields(self._id)
+
+    def __len__(self):
+        return len(self._resident) + len(self._store.lazy_fields(self._id))
+
+    @property
+    def compound_counts(self):
+        """(all, then one per PHRASE_LENGTHS) compound counts, without decoding any text."""
+        return self._store.compound_counts(self._id)
+
+    def __repr__(self):
+        return f"LazyMeta({dict(self)!r})"
+
+class CompiledStore:
+    """Read-only view over a mapped artifact; sections are memoryviews into the mapping."""
+
+    def __init__(self, path, text_cache_size=TEXT_CACHE_SIZE):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version, digest, n_strings, n_chars, n_pool, n_messages = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} compiled store")
+        self.path = path
+        self.source_digest = digest
+        self.n_chars = n_chars
+        position = HEADER.size
+        self.offsets = view[position:position + 4 * (n_strings + 1)].cast("I")
+        position += 4 * (n_strings + 1)
+        self.blob = view[position:position + self.offsets[-1]]
+        position += self.offsets[-1]
+        position += -position % 4
+        self.records = view[position:position + 4 * RECORD_FIELDS * n_chars].cast("I")
+        position += 4 * RECORD_FIELDS * n_chars
+        self.pool = view[position:position + 4 * n_pool].cast("I")
+        position += 4 * n_pool
+        self.message_ids = view[position:position + 8 * n_messages].cast("I")
+        self.lazy_fields = lru_cache(maxsize=text_cache_size)(self._lazy_fields)
+
+    def string(self, string_id):
+        if string_id == MISSING:
+            return None
+        return str(self.blob[self.offsets[string_id]:self.offsets[string_id + 1] - 1], "utf-8")
+
+    def strings(self):
+        """Decode the whole string table in one pass; the list index is the string ID."""
+        return str(self.blob, "utf-8").split("\x00")[:-1]
+
+    def messages(self):
+        ids = self.message_ids
+        return [{"type": self.string(ids[i]), "message": self.string(ids[i + 1])} for i in range(0, len(ids), 2)]
+
+    def to_component_map(self, lazy_text=False):
+        """Rebuild the frozen component map, sharing one str object per interned string.
+
+        With lazy_text, metas are LazyMeta views and the store must stay open while the
+        map is in use; the caller must not close it.
+        """
+        # Nothing built here forms a cycle; collector passes only slow the bulk build
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._build_component_map(lazy_text)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    @staticmethod
+    def _etymology(hint, details, string):
+        """The etymology mapping; string looks up a string ID."""
+        if hint == MISSING and details == MISSING:
+            return EMPTY
+        etymology = {}
+        if hint != MISSING:
+            etymology["hint"] = string(hint)
+        if details != MISSING:
+            etymology["details"] = string(details)
+        return MappingProxyType(etymology)
+
+    def compound_counts(self, char_id):
+        base = char_id * RECORD_FIELDS
+        c_start, c_end = self.records[base + COUNTS_AT - 4:base + COUNTS_AT - 2].tolist()
+        return (c_end - c_start,) + tuple(self.records[base + COUNTS_AT:base + RECORD_FIELDS].tolist())
+
+    def _lazy_fields(self, char_id):
+        """LAZY_FIELDS of one character, decoded straight from the mapping."""
+        base = char_id * RECORD_FIELDS
+        # Unpacked in TEXT_FIELDS / ETYMOLOGY_FIELDS order
+        (_, _, definition, _, _, _, hint, details, c_start, c_end, _, _) = self.records[base:base + COUNTS_AT].tolist()
+        fields = {} if definition == MISSING else {"definition": self.string(definition)}
+        fields["etymology"] = self._etymology(hint, details, self.string)
+        fields["compounds"] = tuple([self.string(sid) for sid in self.pool[c_start:c_end].tolist()])
+        return MappingProxyType(fields)
+
+    def _build_component_map(self, lazy_text):
+        strings = self.strings()
+        records, pool = self.records.tolist(), self.pool.tolist()
+        resident_fields = ("pinyin", "radical", "decomposition", "IDC") if lazy_text else \
+            ("pinyin", "definition", "radical", "decomposition", "IDC")
+        result = {}
+        for base in range(0, len(records), RECORD_FIELDS):
+            # Unpacked in TEXT_FIELDS / ETYMOLOGY_FIELDS order
+            (strokes, pinyin, definition, radical, decomposition, idc,
+             hint, details, c_start, c_end, r_start, r_end) = records[base:base + COUNTS_AT]
+            char_id = base // RECORD_FIELDS
+            sids = {"pinyin": pinyin, "definition": definition, "radical": radical,
+                    "decomposition": decomposition, "IDC": idc}
+            meta = {"strokes": strokes or None}
+            for name in resident_fields:
+                if sids[name] != MISSING:
+                    meta[name] = strings[sids[name]]
+            if lazy_text:
+                meta = LazyMeta(meta, self, char_id)
+            else:
+                meta["etymology"] = self._etymology(hint, details, strings.__getitem__)
+                meta["compounds"] = tuple([strings[sid] for sid in pool[c_start:c_end]])
+                meta = MappingProxyType(meta)
+            result[strings[char_id]] = MappingProxyType({
+                "meta": meta,
+                "related_characters": tuple([strings[sid] for sid in pool[r_start:r_end]]),
+            })
+        return MappingProxyType(result)
+
+    def close(self):
+        self.lazy_fields.cache_clear()
+        for view in (self.offsets, self.blob, self.records, self.pool, self.message_ids):
+            view.release()
+        self._mmap.close()
+
+def open_artifact(source_path, artifact_path=None):
+    """Open the compiled artifact for source_path, or return (None, reason) if missing or stale.
+
+    The artifact is stale when the source JSON exists and its sha256 differs from the one
+    recorded at compile time. A deployment that ships only the artifact is trusted as is.
+    """
+    artifact_path = artifact_path or artifact_path_for(source_path)
+    if not os.path.exists(artifact_path):
+        return None, f"No compiled artifact at {artifact_path}"
+    try:
+        store = CompiledStore(artifact_path)
+    except (OSError, ValueError, struct.error) as e:
+        return None, f"Unreadable compiled artifact {artifact_path}: {e}"
+    if os.path.exists(source_path) and source_digest(source_path) != store.source_digest:
+        store.close()
+        return None, f"Compiled artifact {artifact_path} is stale; recompile with compiled_store.py"
+    return store, None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the component map JSON into a memory-mapped artifact.")
+    parser.add_argument("source", nargs="?", default="enhanced_component_map_with_etymology.json")
+    parser.add_argument("-o", "--output", help="artifact path (default: source with a .radix suffix)")
+    parser.add_argument("--drop-related", action="store_true",
+                        help="omit related_characters; the app derives containment from decompositions")
+    args = parser.parse_args(argv)
+    summary = compile_artifact(args.source, args.output, drop_related=args.drop_related)
+    print(json.dumps(summary, ensure_ascii=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Graph queries over the decomposition structure: paths, shared components and siblings.
+
+DecompositionGraph stores every "is a direct component of" edge in both directions as
+CSR integer arrays: neighbors[offsets[i]:offsets[i + 1]] are the characters one step
+from character i, and directions says whether each step goes down to a component or
+up to a container. Shortest paths are a level-synchronous BFS over those arrays, one
+NumPy gather per level. Shared components and siblings read the closures and the
+containment lists the engine already keeps.
+
+Nothing here imports Streamlit.
+"""
+from bisect import bisect_right
+
+import numpy as np
+
+DOWN, UP = 1, -1  # the next character is a component of, or contains, the current one
+
+class DecompositionGraph:
+    def __init__(self, decomposition_index, containment_index):
+        self.decomposition_index = decomposition_index
+        self.containment_index = containment_index
+        children = decomposition_index["children"]
+        self.size = len(children)
+        lengths = np.fromiter((len(direct) for direct in children), dtype=np.int64, count=self.size)
+        parents = np.repeat(np.arange(self.size, dtype=np.int64), lengths)
+        comps = np.fromiter((comp for direct in children for comp in direct), dtype=np.int64, count=int(lengths.sum()))
+        keep = parents != comps
+        parents, comps = parents[keep], comps[keep]
+        # Each edge packed as (source, target, goes up) in one sortable integer; np.unique
+        # sorts them by source and collapses repeated components such as 木木
+        down = (parents * self.size + comps) * 2
+        up = (comps * self.size + parents) * 2 + 1
+        edges = np.unique(np.concatenate([down, up]))
+        sources, targets = np.divmod(edges >> 1, self.size)
+        self.neighbors = targets.astype(np.int32)
+        self.directions = np.where(edges & 1, UP, DOWN).astype(np.int8)
+        self.offsets = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=self.size), out=self.offsets[1:])
+
+    def shortest_path(self, source, target):
+        """[(id, direction into it)] from source to target, or None if they are unrelated.
+
+        The first step has direction 0. Ties between equally short paths go to the
+        lower character IDs, so the answer is stable.
+        """
+        if source == target:
+            return [(source, 0)]
+        parent = np.full(self.size, -1, dtype=np.int64)
+        step = np.zeros(self.size, dtype=np.int8)
+        parent[source] = source
+        frontier = np.array([source], dtype=np.int64)
+        while frontier.size and parent[target] < 0:
+            starts = self.offsets[frontier]
+            counts = self.offsets[frontier + 1] - starts
+            total = int(counts.sum())
+            if not total:
+                break
+            # Positions of every edge leaving the frontier, in frontier order
+            edges = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+            nodes = self.neighbors[edges]
+            fresh = parent[nodes] < 0
+            nodes, edges = nodes[fresh], edges[fresh]
+            origins = np.repeat(frontier, counts)[fresh]
+            nodes, first = np.unique(nodes, return_index=True)
+            parent[nodes] = origins[first]
+            step[nodes] = self.directions[edges[first]]
+            frontier = nodes
+        if parent[target] < 0:
+            return None
+        path, node = [], target
+        while node != source:
+            path.append((int(node), int(step[node])))
+            node = parent[node]
+        path.append((source, 0))
+        return path[::-1]
+
+    def closure_depths(self, char_id):
+        """{component ID: depth} of char_id's closure, with char_id itself at depth 0."""
+        index = self.decomposition_index
+        start, end = index["offsets"][char_id], index["offsets"][char_id + 1]
+        found = dict(zip(index["members"][start:end], index["depths"][start:end]))
+        found[char_id] = 0
+        return found
+
+    def common_components(self, first, second):
+        """[(id, depth in first, depth in second)] of the lowest shared components.
+
+        A shared component is dropped when it is itself part of another shared one, so
+        想 and 箱 share 相 but not 木 or 目. Closest pairs come first.
+        """
+        first_depths, second_depths = self.closure_depths(first), self.closure_depths(second)
+        common = first_depths.keys() & second_depths.keys()
+        index = self.decomposition_index
+        covered = set()
+        for comp in common:
+            covered.update(c for c in index["members"][index["offsets"][comp]:index["offsets"][comp + 1]] if c != comp)
+        lowest = [(comp, first_depths[comp], second_depths[comp]) for comp in common - covered]
+        lowest.sort(key=lambda item: (item[1] + item[2], item[0]))
+        return lowest
+
+    def siblings(self, char_id, min_shared=2, depth=1):
+        """(ids, shared counts) of the characters sharing at least min_shared of char_id's
+        components within depth levels (0 = any depth), most shared first, ties by ID."""
+        index, containment = self.decomposition_index, self.containment_index
+        start, end = index["offsets"][char_id], index["offsets"][char_id + 1]
+        if depth:
+            end = bisect_right(index["depths"], depth, start, end)
+        comps = [comp for comp in index["members"][start:end] if comp != char_id]
+        if len(comps) < min_shared:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        found = []
+        for comp in comps:
+            c_start, c_end = containment["offsets"][comp], containment["offsets"][comp + 1]
+            if depth:
+                c_end = bisect_right(containment["depths"], depth, c_start, c_end)
+            found.append(np.frombuffer(containment["members"], dtype=np.uint32, count=c_end - c_start, offset=4 * c_start))
+        shared = np.bincount(np.concatenate(found), minlength=self.size)
+        shared[char_id] = 0
+        ids = np.flatnonzero(shared >= min_shared)
+        ids = ids[np.argsort(-shared[ids], kind="stable")]
+        return ids, shared[ids]
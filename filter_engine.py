@@ -0,0 +1,134 @@
+"""Columnar, vectorized filters over character IDs.
+
+Each character ID (the index into the decomposition graph's character table) gets one
+slot in three parallel NumPy columns: int16 stroke counts, int32 radical IDs and uint8
+leading-IDC codes. Any combination of the stroke/radical/IDC filters is then a boolean
+mask, and option lists and stroke ordering are array operations instead of per-character
+dictionary lookups. Characters with the same stroke count are ordered by their position
+in the component map, which for a fresh build is also ID order.
+"""
+import numpy as np
+
+from compiled_store import normalize_strokes
+
+NO_FILTER = "No Filter"
+IDC_CODES = {idc: code for code, idc in enumerate("⿰⿱⿲⿳⿴⿵⿶⿷⿸⿹⿺⿻", start=1)}
+IDC_BY_CODE = {code: idc for idc, code in IDC_CODES.items()}
+
+class ColumnStore:
+    def __init__(self, chars, metas):
+        """chars[i] is the character with ID i; metas[i] is its meta mapping, or None for
+        components that only appear inside decompositions."""
+        n = len(chars)
+        self.chars = chars
+        self.strokes = np.zeros(n, dtype=np.int16)
+        self.radical_ids = np.full(n, -1, dtype=np.int32)
+        self.idc_codes = np.zeros(n, dtype=np.uint8)
+        self.is_entry = np.zeros(n, dtype=bool)
+        self.order = np.arange(n, dtype=np.int64)
+        self.radicals, self.radical_lookup = [], {}
+        for i, meta in enumerate(metas):
+            if meta is not None:
+                self._set_row(i, meta)
+        self.ids = {char: i for i, char in enumerate(chars)}
+
+    def _set_row(self, i, meta):
+        self.is_entry[i] = meta is not None
+        self.strokes[i], self.radical_ids[i], self.idc_codes[i] = 0, -1, 0
+        if meta is None:
+            return
+        self.strokes[i] = min(normalize_strokes(meta.get("strokes")), np.iinfo(np.int16).max)
+        radical = meta.get("radical", "")
+        if isinstance(radical, str) and radical:
+            if radical not in self.radical_lookup:
+                self.radical_lookup[radical] = len(self.radicals)
+                self.radicals.append(radical)
+            self.radical_ids[i] = self.radical_lookup[radical]
+        decomposition = meta.get("decomposition", "")
+        if decomposition:
+            self.idc_codes[i] = IDC_CODES.get(decomposition[0], 0)
+
+    @classmethod
+    def from_component_map(cls, component_map, chars):
+        return cls(chars, [component_map[c].get("meta", {}) if c in component_map else None for c in chars])
+
+    def with_rows(self, chars, rows, entries=None):
+        """A copy extended to the ID table chars (a superset of this one, same IDs), with
+        rows {id: meta or None} rewritten. This store is left unchanged.
+
+        entries is the new component map's keys in order, needed when keys were added or
+        removed: appended IDs no longer follow map order, so the stroke-tie order is
+        renumbered to match a fresh build of that map.
+        """
+        new = ColumnStore.__new__(ColumnStore)
+        n = len(chars)
+        new.chars = chars
+        new.strokes = np.zeros(n, dtype=np.int16)
+        new.radical_ids = np.full(n, -1, dtype=np.int32)
+        new.idc_codes = np.zeros(n, dtype=np.uint8)
+        new.is_entry = np.zeros(n, dtype=bool)
+        new.order = np.arange(n, dtype=np.int64)
+        for name in ("strokes", "radical_ids", "idc_codes", "is_entry", "order"):
+            getattr(new, name)[:len(self.chars)] = getattr(self, name)
+        new.radicals, new.radical_lookup = list(self.radicals), dict(self.radical_lookup)
+        for i, meta in rows.items():
+            new._set_row(i, meta)
+        new.ids = dict(self.ids)
+        for i in range(len(self.chars), n):
+            new.ids[chars[i]] = i
+        if entries is not None:
+            # Map keys first in map order, then the remaining components in ID order
+            entry_ids = new.ids_of(entries)
+            rest = np.ones(n, dtype=bool)
+            rest[entry_ids] = False
+            new.order[entry_ids] = np.arange(len(entry_ids))
+            new.order[rest] = np.arange(len(entry_ids), n)
+        return new
+
+    def ids_of(self, chars):
+        ids = self.ids
+        return np.fromiter((ids[c] for c in chars if c in ids), dtype=np.int64)
+
+    def to_chars(self, ids):
+        chars = self.chars
+        return [chars[i] for i in ids.tolist()]
+
+    def _predicates(self, ids, stroke_count, radical, idc):
+        """Yield one boolean array per active filter, aligned with ids (or all IDs if None)."""
+        def column(values):
+            return values if ids is None else values[ids]
+
+        if stroke_count:
+            yield column(self.strokes) == stroke_count
+        if radical != NO_FILTER:
+            yield column(self.radical_ids) == self.radical_lookup.get(radical, -2)
+        if idc != NO_FILTER:
+            yield column(self.idc_codes) == IDC_CODES.get(idc, 255)
+
+    def mask(self, stroke_count=0, radical=NO_FILTER, idc=NO_FILTER):
+        """Boolean mask over every ID: single-character map entries matching all filters."""
+        result = self.is_entry.copy()
+        for predicate in self._predicates(None, stroke_count, radical, idc):
+            result &= predicate
+        return result
+
+    def select(self, ids, stroke_count=0, radical=NO_FILTER, idc=NO_FILTER):
+        """The subset of the ID array ids that matches the filters, in the same order."""
+        ids = np.asarray(ids, dtype=np.int64)
+        keep = self.is_entry[ids]
+        for predicate in self._predicates(ids, stroke_count, radical, idc):
+            keep &= predicate
+        return ids[keep]
+
+    def radical_options(self, ids):
+        found = np.unique(self.radical_ids[np.asarray(ids, dtype=np.int64)])
+        return sorted(self.radicals[r] for r in found.tolist() if r >= 0)
+
+    def idc_options(self, ids):
+        found = np.unique(self.idc_codes[np.asarray(ids, dtype=np.int64)])
+        return sorted(IDC_BY_CODE[code] for code in found.tolist() if code)
+
+    def sort_by_strokes(self, ids):
+        """Sort by stroke count, then map order; unknown counts (0) come first, as in get_stroke_count order."""
+        ids = np.asarray(ids, dtype=np.int64)
+        return ids[np.lexsort((self.order[ids], self.strokes[ids]))]
@@ -0,0 +1,59 @@
+"""Per-rerun stage timings and one-shot profiling, kept per session.
+
+Nothing here imports Streamlit; the app stores a RerunTimings in session state, wraps
+each stage of a rerun in span(), and calls finish() once the rerun is done.
+"""
+import cProfile
+import io
+import pstats
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+class RerunTimings:
+    """Stage durations for the last `window` reruns, with percentiles per stage."""
+
+    def __init__(self, window=50):
+        self.runs = deque(maxlen=window)
+        self.current = None
+
+    def start(self):
+        self.current = {}
+
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.current is not None:
+                self.current[name] = self.current.get(name, 0.0) + time.perf_counter() - started
+
+    def finish(self):
+        if self.current is not None:
+            self.runs.append(self.current)
+        self.current = None
+
+    def summary(self):
+        """{stage: {"runs", "last", "p50", "p95"}} in seconds, stages in first-seen order."""
+        stages = {}
+        for run in self.runs:
+            for name, seconds in run.items():
+                stages.setdefault(name, []).append(seconds)
+        result = {}
+        for name, values in stages.items():
+            p50, p95 = np.percentile(values, [50, 95])
+            result[name] = {"runs": len(values), "last": values[-1], "p50": float(p50), "p95": float(p95)}
+        return result
+
+def profile_call(func, *args, limit=30, sort="cumulative"):
+    """Run func under cProfile; returns (result, report text of the top `limit` entries)."""
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(func, *args)
+    finally:
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+    return result, out.getvalue()
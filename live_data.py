@@ -0,0 +1,105 @@
+"""Hot reload of the component map.
+
+LiveData polls the data file from a daemon thread. When the file changes it is loaded
+again, every entry is hashed, and the keys whose hash differs from the loaded snapshot
+are handed to QueryEngine.updated(), which rebuilds only the derived structures those
+keys can affect. The finished Snapshot replaces `current` in a single assignment, so a
+rerun that read `current` before the swap keeps a complete, consistent snapshot.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+from compiled_store import ETYMOLOGY_FIELDS, TEXT_FIELDS, artifact_path_for, normalize_strokes, normalize_text
+from query_engine import QueryEngine, load_data
+
+Snapshot = namedtuple("Snapshot", "version component_map report engine digests signature")
+
+def entry_digest(entry):
+    """Hash the fields the app derives anything from, normalized the way the compiled
+    artifact stores them, so the JSON and artifact forms of an entry hash the same."""
+    meta = entry.get("meta", {}) or {}
+    etymology = meta.get("etymology", {}) or {}
+    canonical = [normalize_strokes(meta.get("strokes"))]
+    canonical += [normalize_text(meta.get(name)) for name in TEXT_FIELDS]
+    canonical += [normalize_text(etymology.get(name)) for name in ETYMOLOGY_FIELDS]
+    canonical.append([normalize_text(item) for item in meta.get("compounds", []) or []])
+    return hashlib.blake2b(json.dumps(canonical, ensure_ascii=False).encode("utf-8"), digest_size=16).digest()
+
+def file_signature(path):
+    """(mtime_ns, size) of the data file and of its compiled artifact; None where missing."""
+    signature = []
+    for candidate in (path, artifact_path_for(path)):
+        try:
+            stat = os.stat(candidate)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+class LiveData:
+    def __init__(self, path, interval=2.0, rebuild_ratio=0.25, lazy_text=False):
+        """rebuild_ratio: above this fraction of changed entries, rebuild from scratch.
+        lazy_text is passed to load_data for every load."""
+        self.path = path
+        self.lazy_text = lazy_text
+        self.interval = interval
+        self.rebuild_ratio = rebuild_ratio
+        self.listeners = []
+        self.events = deque(maxlen=20)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        signature = file_signature(path)
+        data, report = load_data(path, lazy_text)
+        self.current = Snapshot(1, data, report, QueryEngine(data, lazy_text=report["lazy_text"], normalized=report["normalized"]),
+                                {char: entry_digest(entry) for char, entry in data.items()}, signature)
+
+    def check(self):
+        """Reload if the file changed since the current snapshot; True if a new one was swapped in."""
+        with self._lock:
+            old = self.current
+            signature = file_signature(self.path)
+            if signature == old.signature:
+                return False
+            started = time.time()
+            data, report = load_data(self.path, self.lazy_text)
+            digests = {char: entry_digest(entry) for char, entry in data.items()}
+            changed = [char for char in data if old.digests.get(char) != digests[char]]
+            changed += [char for char in old.digests if char not in digests]
+            if not changed:
+                self.current = old._replace(signature=signature)
+                self.events.append({"at": started, "mode": "unchanged", "changed": 0, "seconds": time.time() - started})
+                return False
+            if (len(changed) > self.rebuild_ratio * max(len(old.digests), 1)
+                    or report["lazy_text"] != old.engine.lazy_text
+                    or report["normalized"] != old.engine.normalized):
+                mode, engine = "full", QueryEngine(data, lazy_text=report["lazy_text"], normalized=report["normalized"])
+            else:
+                mode, engine = "incremental", old.engine.updated(data, changed)
+            self.current = Snapshot(old.version + 1, data, report, engine, digests, signature)
+            self.events.append({"at": started, "mode": mode, "changed": len(changed), "seconds": time.time() - started})
+        for listener in self.listeners:
+            listener(self.current)
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # Keep serving the current snapshot; a half-written file is retried next poll
+                self.events.append({"at": time.time(), "mode": "error", "changed": 0, "seconds": 0.0,
+                                    "error": f"{type(e).__name__}: {e}"})
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="live-data-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,108 @@
+"""Background prefetch of the queries a user is likely to run next.
+
+A Prefetcher is shared by every session. Each session submits a batch of tasks after
+a result set is shown; a new batch from the same session cancels the previous one.
+Tasks that have not started are dropped, and running tasks stop at their next step.
+A task is a generator function that yields the cache key of each entry it stores, or
+None for a step that stored nothing. Cancellation is checked at every yield, so a long
+prefetch never holds a worker past it. At most max_pending tasks wait at any time, and
+extra tasks are dropped rather than queued.
+
+Nothing here imports Streamlit; tasks must not touch session state.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+class Prefetcher:
+    def __init__(self, workers=1, max_pending=32, max_tracked=1024):
+        self.max_pending = max_pending
+        self.max_tracked = max_tracked
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._batches = {}  # owner -> (cancel event, futures)
+        self._prefetched = OrderedDict()  # keys computed by a prefetch and not yet used
+        self._pending = 0
+        self.submitted = self.completed = self.cancelled = self.dropped = self.failed = 0
+        self.lookups = self.hits = 0
+
+    def submit(self, owner, tasks):
+        """Replace owner's batch with tasks, an iterable of generator functions."""
+        self.cancel(owner)
+        cancel = threading.Event()
+        futures = []
+        with self._lock:
+            self._batches[owner] = (cancel, futures)
+            for task in tasks:
+                if self._pending >= self.max_pending:
+                    self.dropped += 1
+                    continue
+                self._pending += 1
+                self.submitted += 1
+                futures.append(self._executor.submit(self._run, task, cancel))
+
+    def cancel(self, owner):
+        with self._lock:
+            batch = self._batches.pop(owner, None)
+        if batch is None:
+            return
+        cancel, futures = batch
+        cancel.set()
+        for future in futures:
+            if future.cancel():
+                with self._lock:
+                    self._pending -= 1
+                    self.cancelled += 1
+
+    def _run(self, task, cancel):
+        outcome = "completed"
+        try:
+            for key in task():
+                if key is not None:
+                    self._track(key)
+                if cancel.is_set():
+                    outcome = "cancelled"
+                    break
+        except Exception:
+            # A failed prefetch only costs the hit; the foreground run computes it again
+            outcome = "failed"
+        with self._lock:
+            self._pending -= 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def _track(self, key):
+        with self._lock:
+            self._prefetched[key] = None
+            self._prefetched.move_to_end(key)
+            while len(self._prefetched) > self.max_tracked:
+                self._prefetched.popitem(last=False)
+
+    def lookup(self, key):
+        """Record a foreground lookup of key; True if a prefetch had computed it."""
+        with self._lock:
+            self.lookups += 1
+            if key in self._prefetched:
+                del self._prefetched[key]
+                self.hits += 1
+                return True
+            return False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "tracked": len(self._prefetched),
+            }
+
+    def shutdown(self):
+        for owner in list(self._batches):
+            self.cancel(owner)
+        self._executor.shutdown(wait=False)
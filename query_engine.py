@@ -0,0 +1,1017 @@
+"""Headless query engine: the component map, its indexes and every result query.
+
+Nothing here imports Streamlit. The app builds one QueryEngine per process and the
+batch CLI builds one per worker:
+
+    python query_engine.py queries.jsonl -o decks.jsonl --workers 4
+
+Each input line is either a plain component query such as 氵木-口 or a JSON object
+like {"query": "心", "phrases": 2, "depth": 1, "idc": "⿱", "radical": "心"}, where depth
+limits how deeply the components may be nested (default 0, any depth). One JSON
+line is written per query, in input order, as soon as its chunk is done.
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from types import MappingProxyType
+
+import numpy as np
+
+from compiled_store import PHRASE_LENGTHS, open_artifact
+from decomposition_graph import DecompositionGraph
+from filter_engine import IDC_BY_CODE, NO_FILTER, ColumnStore
+from text_search import TextIndex
+
+DATA_FILE = "enhanced_component_map_with_etymology.json"
+
+# Global IDC characters
+IDC_CHARS = {'⿰', '⿱', '⿲', '⿳', '⿴', '⿵', '⿶', '⿷', '⿸', '⿹', '⿺', '⿻'}
+IDC_ARITY = {idc: 3 if idc in ('⿲', '⿳') else 2 for idc in IDC_CHARS}
+IDC_SLOTS = {
+    '⿰': ("left", "right"), '⿱': ("top", "bottom"),
+    '⿲': ("left", "middle", "right"), '⿳': ("top", "middle", "bottom"),
+    '⿴': ("outside", "inside"), '⿵': ("outside", "inside"), '⿶': ("outside", "inside"),
+    '⿷': ("outside", "inside"), '⿸': ("outside", "inside"), '⿹': ("outside", "inside"),
+    '⿺': ("outside", "inside"), '⿻': ("first", "second"),
+}
+LABEL_CACHE_SIZE = 2048  # formatted (label, details) pairs kept for cards the label table leaves out
+LAZY_LABEL_CACHE_SIZE = 8192  # dropdown labels kept for a lazy map, which has no label table
+
+# Data loading
+def freeze(value):
+    """Recursively convert dicts to read-only mappings and lists to tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+def load_data(path=DATA_FILE, lazy_text=False):
+    """Load the component map as an immutable structure, with a frozen load report.
+
+    The compiled artifact from compiled_store.py is preferred; the JSON is parsed and
+    cleaned only when the artifact is missing or stale. With lazy_text and an artifact,
+    definitions, etymology and compounds stay in the mapped file until a character's
+    text is needed; report["lazy_text"] says whether that happened. report["normalized"]
+    is True when every field was normalized at compile time, so readers can skip
+    clean_field and stroke_count. Raises on failure.
+    """
+    started = time.time()
+    store, reason = open_artifact(path)
+    if store is not None:
+        try:
+            data = store.to_component_map(lazy_text=lazy_text)
+            messages = store.messages()
+        finally:
+            if not lazy_text:
+                store.close()
+        report = {
+            "source": store.path,
+            "loaded_at": started,
+            "load_seconds": time.time() - started,
+            "entries": len(data),
+            "lazy_text": lazy_text,
+            "normalized": True,
+            "messages": messages,
+        }
+        return data, freeze(report)
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    messages = [{"type": "warning", "message": reason}] + clean_decompositions(data)
+    report = {
+        "source": path,
+        "loaded_at": started,
+        "load_seconds": time.time() - started,
+        "entries": len(data),
+        "lazy_text": False,
+        "normalized": False,
+        "messages": messages,
+    }
+    return freeze(data), freeze(report)
+
+def clean_decompositions(data):
+    """Blank out decompositions containing '?' in place; returns one warning per entry."""
+    messages = []
+    for char, entry in data.items():
+        decomposition = entry.get("meta", {}).get("decomposition", "")
+        if '?' in decomposition:
+            messages.append({
+                "type": "warning",
+                "message": f"Invalid component '?' in decomposition for {char}: {decomposition}"
+            })
+            entry["meta"]["decomposition"] = ""
+    return messages
+
+# Field helpers
+def clean_field(field):
+    return field[0] if isinstance(field, (list, tuple)) and field else field or "—"
+
+def stroke_count(meta):
+    strokes = meta.get("strokes", None)
+    try:
+        if isinstance(strokes, (int, float)) and strokes > 0:
+            return int(strokes)
+        elif isinstance(strokes, str) and strokes.isdigit():
+            return int(strokes)
+    except (TypeError, ValueError):
+        pass
+    return None
+
+# For a normalized map: strokes are already an int or None and text fields one string
+def trusted_field(field):
+    return field or "—"
+
+def trusted_stroke_count(meta):
+    return meta.get("strokes")
+
+def get_etymology_text(meta, clean=clean_field):
+    etymology = meta.get("etymology", {})
+    hint = clean(etymology.get("hint", "No hint available"))
+    details = clean(etymology.get("details", ""))
+    return f"{hint}{'; Details: ' + details if details and details != '—' else ''}"
+
+def phrase_length(display_mode):
+    """0 for "Single Character", otherwise the phrase length of the output type."""
+    return 0 if display_mode == "Single Character" else int(display_mode[0])
+
+def parse_component_query(text):
+    """Split input like "氵木-口" into included and excluded components."""
+    include, _, exclude = "".join(text.split()).partition("-")
+    exclude = exclude.replace("-", "")
+    return tuple(dict.fromkeys(include)), tuple(dict.fromkeys(c for c in exclude if c not in include))
+
+def format_position(position):
+    idc, slot = position
+    return f"{idc} {IDC_SLOTS[idc][slot]}"
+
+def format_char_card(char, details, phrase_count=0, compounds=(), compounds_title=""):
+    """HTML for one result card; compounds are listed sorted under compounds_title."""
+    count_html = f"<span class='phrase-count'>{phrase_count} phrase{'s' if phrase_count != 1 else ''}</span>" if phrase_count else ""
+    card = f"<div class='char-card'><h3 class='char-title'>{char}</h3>{count_html}<p class='details'>{details}</p>"
+    if compounds:
+        compounds_text = " ".join(sorted(compounds))
+        card += f"<div class='compounds-section'><p class='compounds-title'>{compounds_title}</p><p class='compounds-list'>{compounds_text}</p></div>"
+    return card + "</div>"
+
+# Index builders
+# Each update_* function returns a new index for the changed keys and leaves the old one
+# untouched; the build_* functions are the same update applied to an empty index.
+def facet_entry(comp, entry):
+    """(strokes, radical, idc) of a single-character entry; strokes 0 and "" mean unknown."""
+    meta = entry.get("meta", {})
+    strokes = stroke_count(meta) or 0
+    radical = meta.get("radical", "")
+    radical = radical if isinstance(radical, str) else ""
+    decomposition = meta.get("decomposition", "")
+    idc = decomposition[0] if decomposition and decomposition[0] in IDC_CHARS else ""
+    return strokes, radical, idc
+
+EMPTY_FACET_INDEX = {
+    "singles": frozenset(), "by_strokes": {}, "by_radical": {}, "by_idc": {}, "counts": {},
+    "stroke_options": [], "radical_options": {}, "idc_options": {}, "self_radicals": frozenset(),
+}
+
+def build_facet_index(component_map):
+    """Invert stroke count, radical and leading IDC into character sets, with cross-facet counts.
+
+    The wildcard keys 0 (strokes) and "No Filter" (radical, IDC) are filled in too, so the
+    cascading dropdown options are plain lookups instead of scans over the whole map.
+    """
+    return update_facet_index(EMPTY_FACET_INDEX, {}, component_map, component_map)
+
+def update_facet_index(index, old_map, component_map, changed):
+    singles, self_radicals = set(index["singles"]), set(index["self_radicals"])
+    counts = dict(index["counts"])
+    buckets = {name: dict(index[name]) for name in ("by_strokes", "by_radical", "by_idc")}
+    touched = {name: {} for name in buckets}
+
+    def bucket(name, key):
+        if key not in touched[name]:
+            touched[name][key] = set(buckets[name].get(key, ()))
+        return touched[name][key]
+
+    for comp in changed:
+        for source, sign in ((old_map, -1), (component_map, 1)):
+            entry = source.get(comp)
+            if entry is None:
+                continue
+            if entry.get("meta", {}).get("radical", "") == comp:
+                (self_radicals.add if sign > 0 else self_radicals.discard)(comp)
+            if not isinstance(comp, str) or len(comp) != 1:
+                continue
+            (singles.add if sign > 0 else singles.discard)(comp)
+            strokes, radical, idc = facet_entry(comp, entry)
+            for name, key in (("by_strokes", strokes), ("by_radical", radical), ("by_idc", idc)):
+                if key:
+                    (bucket(name, key).add if sign > 0 else bucket(name, key).discard)(comp)
+            for s in {0, strokes}:
+                for r in {NO_FILTER, radical or NO_FILTER}:
+                    for i in {NO_FILTER, idc or NO_FILTER}:
+                        counts[(s, r, i)] = counts.get((s, r, i), 0) + sign
+                        if not counts[(s, r, i)]:
+                            del counts[(s, r, i)]
+    for name, found in touched.items():
+        for key, members in found.items():
+            if members:
+                buckets[name][key] = frozenset(members)
+            else:
+                buckets[name].pop(key, None)
+
+    radical_options, idc_options = {}, {}
+    for s, r, i in counts:
+        if r != NO_FILTER and i == NO_FILTER:
+            radical_options.setdefault(s, set()).add(r)
+        if i != NO_FILTER:
+            idc_options.setdefault((s, r), set()).add(i)
+    return {
+        "singles": frozenset(singles),
+        **buckets,
+        "counts": counts,
+        "stroke_options": sorted(buckets["by_strokes"]),
+        "radical_options": {k: sorted(v) for k, v in radical_options.items()},
+        "idc_options": {k: sorted(v) for k, v in idc_options.items()},
+        "self_radicals": frozenset(self_radicals),
+    }
+
+def parse_ids(decomposition, i=0):
+    """Parse the IDS term at i into a tree of (idc, child, ...) tuples with character leaves.
+
+    Returns (tree, end index), or (None, None) if the term is truncated.
+    """
+    if i >= len(decomposition):
+        return None, None
+    if decomposition[i] not in IDC_CHARS:
+        return decomposition[i], i + 1
+    node, j = [decomposition[i]], i + 1
+    for _ in range(IDC_ARITY[decomposition[i]]):
+        child, j = parse_ids(decomposition, j)
+        if child is None:
+            return None, None
+        node.append(child)
+    return tuple(node), j
+
+def closure(children, root):
+    """(component ID, depth) pairs reachable from root, sorted by (depth, ID)."""
+    reached = {}
+    frontier, level = children[root], 1
+    while frontier:
+        next_frontier = []
+        for comp in frontier:
+            if comp not in reached:
+                reached[comp] = level
+                next_frontier.extend(children[comp])
+        frontier, level = next_frontier, level + 1
+    return sorted(reached.items(), key=lambda item: (item[1], item[0]))
+
+def build_decomposition_index(component_map):
+    """Precompute every character's transitive component closure over integer IDs.
+
+    Closures are stored CSR-style: members[offsets[i]:offsets[i + 1]] are the component
+    IDs of character i sorted by (depth, ID), with the matching nesting level (1 = direct
+    component) in depths. Well-formed decompositions are parsed once into IDC trees, and
+    cycles and malformed decompositions are reported from the same pass.
+    """
+    empty = {"chars": (), "ids": {}, "children": (), "trees": {}, "malformed_by_char": {},
+             "cycle_depths": {}, "offsets": array("I", [0]), "members": array("I"), "depths": array("H")}
+    chars = [c for c in component_map if isinstance(c, str) and len(c) == 1]
+    return update_decomposition_index(empty, None, component_map, chars)[0]
+
+def update_decomposition_index(index, containment_index, component_map, changed):
+    """Returns (new index, IDs of the roots whose closure was recomputed).
+
+    Character IDs are stable: new characters are appended and a removed entry keeps its
+    ID as a plain component. Only the changed characters and the characters that contained
+    them (per containment_index) can have a different closure, so only those are walked.
+    """
+    chars, ids = list(index["chars"]), dict(index["ids"])
+    children, trees, malformed = list(index["children"]), dict(index["trees"]), dict(index["malformed_by_char"])
+    changed = [c for c in changed if isinstance(c, str) and len(c) == 1]
+    for char in changed:
+        if char not in ids:
+            ids[char] = len(chars)
+            chars.append(char)
+            children.append(())
+    affected = {ids[char] for char in changed}
+    if containment_index is not None:
+        offsets, members = containment_index["offsets"], containment_index["members"]
+        for char_id in list(affected):
+            if char_id < len(offsets) - 1:
+                affected.update(members[offsets[char_id]:offsets[char_id + 1]])
+    for char in changed:
+        trees.pop(char, None)
+        malformed.pop(char, None)
+        entry = component_map.get(char)
+        decomposition = entry.get("meta", {}).get("decomposition", "") if entry is not None else ""
+        if decomposition and decomposition != char:
+            tree, end = parse_ids(decomposition)
+            if end != len(decomposition):
+                malformed[char] = decomposition
+            elif isinstance(tree, tuple):
+                trees[char] = tree
+        direct = []
+        for comp in decomposition:
+            if comp in IDC_CHARS or comp == '?':
+                continue
+            if comp not in ids:
+                ids[comp] = len(chars)
+                chars.append(comp)
+                children.append(())
+                affected.add(ids[comp])
+            direct.append(ids[comp])
+        children[ids[char]] = tuple(direct)
+
+    old_offsets, old_members, old_depths = index["offsets"], index["members"], index["depths"]
+    offsets, members, depths = array("I", [0]), array("I"), array("H")
+    cycle_depths = {root: depth for root, depth in index["cycle_depths"].items() if root not in affected}
+    for root in range(len(chars)):
+        if root in affected:
+            reached = closure(children, root)
+            for comp, depth in reached:
+                members.append(comp)
+                depths.append(depth)
+                if comp == root and children[root] != (root,):
+                    cycle_depths[root] = depth
+        elif root < len(old_offsets) - 1:
+            members.extend(old_members[old_offsets[root]:old_offsets[root + 1]])
+            depths.extend(old_depths[old_offsets[root]:old_offsets[root + 1]])
+        offsets.append(len(members))
+
+    missing = {}
+    for char_id, direct in enumerate(children):
+        for comp in direct:
+            if chars[comp] not in component_map:
+                missing.setdefault(chars[comp], chars[char_id])
+    new_index = {
+        "chars": tuple(chars),
+        "ids": ids,
+        "children": tuple(children),
+        "trees": trees,
+        "malformed_by_char": malformed,
+        "cycle_depths": cycle_depths,
+        "offsets": offsets,
+        "members": members,
+        "depths": depths,
+        "cycles": tuple(f"{chars[root]} contains itself at depth {depth}" for root, depth in sorted(cycle_depths.items())),
+        "malformed": tuple(f"{char}: {decomposition}" for char, decomposition in malformed.items()),
+        "missing": tuple(f"{comp} (first seen in {char})" for comp, char in missing.items()),
+    }
+    return new_index, affected
+
+def build_containment_index(decomposition_index):
+    """Invert the closures: for each component, the characters containing it and at which depth.
+
+    Stored CSR-style like the closures, with containers sorted by (depth, ID), so a
+    depth-limited query is a bisect plus a slice.
+    """
+    index = decomposition_index
+    offsets, members, depths = index["offsets"], index["members"], index["depths"]
+    containers = [[] for _ in index["chars"]]
+    for root in range(len(offsets) - 1):
+        for k in range(offsets[root], offsets[root + 1]):
+            if members[k] != root:
+                containers[members[k]].append((depths[k], root))
+    reverse_offsets, reverse_members, reverse_depths = array("I", [0]), array("I"), array("H")
+    for found in containers:
+        found.sort()
+        reverse_members.extend(root for _, root in found)
+        reverse_depths.extend(depth for depth, _ in found)
+        reverse_offsets.append(len(reverse_members))
+    return {"offsets": reverse_offsets, "members": reverse_members, "depths": reverse_depths}
+
+def update_containment_index(containment_index, old_index, new_index, affected):
+    """Re-invert only the components that entered or left an affected root's closure."""
+    def closure_slice(index, root):
+        offsets = index["offsets"]
+        if root >= len(offsets) - 1:
+            return (), ()
+        return index["members"][offsets[root]:offsets[root + 1]], index["depths"][offsets[root]:offsets[root + 1]]
+
+    touched = {}
+    for root in affected:
+        for index in (old_index, new_index):
+            for comp in closure_slice(index, root)[0]:
+                touched.setdefault(comp, [])
+    old_offsets, old_members, old_depths = (containment_index[k] for k in ("offsets", "members", "depths"))
+    for comp, found in touched.items():
+        if comp < len(old_offsets) - 1:
+            start, end = old_offsets[comp], old_offsets[comp + 1]
+            found.extend((depth, root) for depth, root in zip(old_depths[start:end], old_members[start:end])
+                         if root not in affected)
+    for root in affected:
+        comps, levels = closure_slice(new_index, root)
+        for comp, depth in zip(comps, levels):
+            if comp != root:
+                touched[comp].append((depth, root))
+
+    offsets, members, depths = array("I", [0]), array("I"), array("H")
+    for comp in range(len(new_index["chars"])):
+        if comp in touched:
+            found = sorted(touched[comp])
+            members.extend(root for _, root in found)
+            depths.extend(depth for depth, _ in found)
+        elif comp < len(old_offsets) - 1:
+            members.extend(old_members[old_offsets[comp]:old_offsets[comp + 1]])
+            depths.extend(old_depths[old_offsets[comp]:old_offsets[comp + 1]])
+        offsets.append(len(members))
+    return {"offsets": offsets, "members": members, "depths": depths}
+
+def tree_placements(tree):
+    """(component, idc, slot, at_root) for every leaf under every slot of an IDC tree.
+
+    A component counts as being in a slot when it appears anywhere in the slot's subtree,
+    so ⿱(⿰木木)心 places 木 under both (⿱, top) and (⿰, left/right).
+    """
+    found = set()
+
+    def walk(node, is_root):
+        idc, leaves = node[0], set()
+        for slot, child in enumerate(node[1:]):
+            below = walk(child, False) if isinstance(child, tuple) else {child}
+            for comp in below:
+                found.add((comp, idc, slot, is_root))
+            leaves |= below
+        return leaves
+
+    walk(tree, True)
+    return found
+
+def build_position_index(decomposition_index):
+    """Map (component, IDC, slot) to the characters with that component in that slot.
+
+    "outermost" keeps only placements under the root IDC of the character's own tree.
+    """
+    empty = {"anywhere": {}, "outermost": {}, "positions": {}}
+    return update_position_index(empty, {}, decomposition_index["trees"], decomposition_index["trees"])
+
+def update_position_index(index, old_trees, trees, changed):
+    anywhere, outermost = dict(index["anywhere"]), dict(index["outermost"])
+    touched = {"anywhere": {}, "outermost": {}}
+
+    def bucket(name, key):
+        if key not in touched[name]:
+            touched[name][key] = set((anywhere if name == "anywhere" else outermost).get(key, ()))
+        return touched[name][key]
+
+    for char in changed:
+        for source, sign in ((old_trees, -1), (trees, 1)):
+            if char not in source:
+                continue
+            for comp, idc, slot, at_root in tree_placements(source[char]):
+                for name in ("anywhere", "outermost") if at_root else ("anywhere",):
+                    (bucket(name, (comp, idc, slot)).add if sign > 0 else bucket(name, (comp, idc, slot)).discard)(char)
+    for name, target in (("anywhere", anywhere), ("outermost", outermost)):
+        for key, chars in touched[name].items():
+            if chars:
+                target[key] = frozenset(chars)
+            else:
+                target.pop(key, None)
+
+    positions = dict(index["positions"])
+    by_comp = {}
+    for comp, idc, slot in touched["anywhere"]:
+        by_comp.setdefault(comp, set(positions.get(comp, ()))).add((idc, slot))
+    for comp, found in by_comp.items():
+        found = sorted(position for position in found if (comp,) + position in anywhere)
+        if found:
+            positions[comp] = found
+        else:
+            positions.pop(comp, None)
+    return {"anywhere": anywhere, "outermost": outermost, "positions": positions}
+
+def build_compound_index(component_map, decomposition_index, keep_compounds=True):
+    """Bucket every entry's compounds by length.
+
+    buckets[n][char] holds char's n-character compounds in source order. counts[n] is an
+    int32 array over character IDs; counts[0] counts compounds of any length. Without
+    keep_compounds, buckets is None and compounds are read from the map when needed;
+    a lazy meta's compound_counts from the artifact then stand in for reading them here.
+    """
+    empty = {"buckets": {n: {} for n in PHRASE_LENGTHS} if keep_compounds else None,
+             "counts": {n: np.zeros(0, dtype=np.int32) for n in (0,) + PHRASE_LENGTHS}}
+    chars = decomposition_index["chars"]
+    return update_compound_index(empty, component_map, chars, range(len(chars)))
+
+def update_compound_index(index, component_map, chars, changed_ids):
+    buckets = {n: dict(found) for n, found in index["buckets"].items()} if index["buckets"] is not None else None
+    counts = {}
+    for n, old in index["counts"].items():
+        counts[n] = np.zeros(len(chars), dtype=np.int32)
+        counts[n][:len(old)] = old
+    for i in changed_ids:
+        char = chars[i]
+        for n in PHRASE_LENGTHS:
+            if buckets is not None:
+                buckets[n].pop(char, None)
+            counts[n][i] = 0
+        entry = component_map.get(char)
+        meta = entry.get("meta", {}) if entry is not None else {}
+        stored = getattr(meta, "compound_counts", None) if buckets is None else None
+        if stored is not None:
+            for n, found in zip((0,) + PHRASE_LENGTHS, stored):
+                counts[n][i] = found
+            continue
+        compounds = meta.get("compounds", [])
+        counts[0][i] = len(compounds)
+        by_length = {}
+        for comp in compounds:
+            by_length.setdefault(len(comp), []).append(comp)
+        for n in PHRASE_LENGTHS:
+            if n in by_length:
+                if buckets is not None:
+                    buckets[n][char] = tuple(by_length[n])
+                counts[n][i] = len(by_length[n])
+    return {"buckets": buckets, "counts": counts}
+
+def bitset_to_ids(bits):
+    found = []
+    for byte_index, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, "little")):
+        while byte:
+            low = byte & -byte
+            found.append((byte_index << 3) + low.bit_length() - 1)
+            byte ^= low
+    return found
+
+# Queries
+class QueryEngine:
+    """Every index over one component map, and the queries the app and the CLI run on them."""
+
+    def __init__(self, component_map, bitset_cache_size=4096, lazy_text=False, normalized=False):
+        """lazy_text: component_map came from load_data(lazy_text=True); text read from it
+        is not copied into the compound buckets or the label table.
+        normalized: load_data reported the map normalized; fields are read without coercion."""
+        self.component_map = component_map
+        self.lazy_text = lazy_text
+        self._set_normalized(normalized)
+        self.facet_index = build_facet_index(component_map)
+        self.decomposition_index = build_decomposition_index(component_map)
+        self.containment_index = build_containment_index(self.decomposition_index)
+        self.position_index = build_position_index(self.decomposition_index)
+        self.column_store = ColumnStore.from_component_map(component_map, self.decomposition_index["chars"])
+        self.compound_index = build_compound_index(component_map, self.decomposition_index, keep_compounds=not lazy_text)
+        self._init_caches(bitset_cache_size)
+
+    def _set_normalized(self, normalized):
+        self.normalized = normalized
+        self.clean_field = trusted_field if normalized else clean_field
+        self.stroke_count = trusted_stroke_count if normalized else stroke_count
+
+    def _init_caches(self, bitset_cache_size):
+        self.bitset_cache_size = bitset_cache_size
+        self.containment_bitset = lru_cache(maxsize=bitset_cache_size)(self._containment_bitset)
+        self.cached_labels = lru_cache(maxsize=LABEL_CACHE_SIZE)(self.format_labels)
+        self.cached_label = lru_cache(maxsize=LAZY_LABEL_CACHE_SIZE)(self.format_label)
+        self._label_table = None
+        self._text_index = None
+        self._graph = None
+
+    def updated(self, component_map, changed):
+        """A new engine for component_map, rebuilding only what the changed keys can affect.
+
+        changed holds every key added, removed or modified relative to this engine's map.
+        This engine is left untouched, so sessions still holding it keep a consistent view.
+        """
+        new = QueryEngine.__new__(QueryEngine)
+        new.component_map = component_map
+        new.lazy_text = self.lazy_text
+        new._set_normalized(self.normalized)
+        new.facet_index = update_facet_index(self.facet_index, self.component_map, component_map, changed)
+        new.decomposition_index, affected = update_decomposition_index(
+            self.decomposition_index, self.containment_index, component_map, changed
+        )
+        new.containment_index = update_containment_index(
+            self.containment_index, self.decomposition_index, new.decomposition_index, affected
+        )
+        new.position_index = update_position_index(
+            self.position_index, self.decomposition_index["trees"], new.decomposition_index["trees"], changed
+        )
+        chars, ids = new.decomposition_index["chars"], new.decomposition_index["ids"]
+        changed_ids = [ids[c] for c in changed if c in ids]
+        keys_changed = any((c in component_map) != (c in self.component_map) for c in changed)
+        new.column_store = self.column_store.with_rows(
+            chars, {i: component_map[chars[i]].get("meta", {}) if chars[i] in component_map else None for i in changed_ids},
+            entries=list(component_map) if keys_changed else None,
+        )
+        new.compound_index = update_compound_index(self.compound_index, component_map, chars, changed_ids)
+        new._init_caches(self.bitset_cache_size)
+        if self._label_table is not None and not new.lazy_text:
+            labels, details = (dict(table) for table in (self._label_table["labels"], self._label_table["details"]))
+            for char in changed:
+                labels.pop(char, None)
+                details.pop(char, None)
+                if char in component_map:
+                    labels[char], details[char] = new.format_labels(char)
+            new._label_table = {"labels": labels, "details": details}
+        return new
+
+    def meta(self, char):
+        return self.component_map.get(char, {}).get("meta", {})
+
+    def get_stroke_count(self, char):
+        return self.stroke_count(self.meta(char))
+
+    def get_etymology_text(self, meta):
+        return get_etymology_text(meta, self.clean_field)
+
+    def format_decomposition(self, char):
+        """Format the decomposition to show full structure, ignoring invalid components."""
+        decomposition = self.meta(char).get("decomposition", "")
+        if not decomposition or (not self.normalized and '?' in decomposition):
+            return "—"
+        return decomposition
+
+    def filter_components(self, stroke_count, radical, component_idc):
+        """Return the single-character components matching the input filters as a set."""
+        facets = [self.facet_index["singles"]]
+        if stroke_count != 0:
+            facets.append(self.facet_index["by_strokes"].get(stroke_count, frozenset()))
+        if radical != NO_FILTER:
+            facets.append(self.facet_index["by_radical"].get(radical, frozenset()))
+        if component_idc != NO_FILTER:
+            facets.append(self.facet_index["by_idc"].get(component_idc, frozenset()))
+        facets.sort(key=len)
+        return facets[0].intersection(*facets[1:])
+
+    def get_all_components(self, char, max_depth):
+        """Components of char down to max_depth + 1 nesting levels, read from the precomputed closure."""
+        index = self.decomposition_index
+        char_id = index["ids"].get(char)
+        if char_id is None:
+            return set()
+        start, end = index["offsets"][char_id], index["offsets"][char_id + 1]
+        end = bisect_right(index["depths"], max_depth + 1, start, end)
+        chars = index["chars"]
+        return {chars[comp] for comp in index["members"][start:end]}
+
+    def get_containing_ids(self, comp, max_depth=0):
+        char_id = self.decomposition_index["ids"].get(comp)
+        if char_id is None:
+            return []
+        index = self.containment_index
+        start, end = index["offsets"][char_id], index["offsets"][char_id + 1]
+        if max_depth:
+            end = bisect_right(index["depths"], max_depth, start, end)
+        return index["members"][start:end]
+
+    def get_containing_characters(self, comp, max_depth=0):
+        """Characters whose decomposition contains comp within max_depth levels (0 = any depth)."""
+        chars = self.decomposition_index["chars"]
+        return [chars[root] for root in self.get_containing_ids(comp, max_depth)]
+
+    def _containment_bitset(self, comp, max_depth=0):
+        """Containers of comp as a Python int with bit i set for character ID i."""
+        bitmap = bytearray((len(self.decomposition_index["chars"]) + 7) // 8)
+        for root in self.get_containing_ids(comp, max_depth):
+            bitmap[root >> 3] |= 1 << (root & 7)
+        return int.from_bytes(bitmap, "little")
+
+    def search_component_ids(self, include, exclude=(), max_depth=0):
+        """IDs of characters containing every component in include within max_depth levels and
+        none in exclude at any depth, in ID order."""
+        bits = None
+        for comp in include:
+            bits = self.containment_bitset(comp, max_depth) if bits is None else bits & self.containment_bitset(comp, max_depth)
+            if not bits:
+                return []
+        for comp in exclude:
+            bits &= ~self.containment_bitset(comp, 0)
+        return bitset_to_ids(bits or 0)
+
+    def search_components(self, include, exclude=(), max_depth=0):
+        chars = self.decomposition_index["chars"]
+        return [chars[i] for i in self.search_component_ids(include, exclude, max_depth)]
+
+    def get_positioned_characters(self, comp, idc, slot, outermost_only=False):
+        """Characters with comp in the given slot of an idc, e.g. ("心", "⿱", 1) for 心 at the bottom."""
+        index = self.position_index["outermost" if outermost_only else "anywhere"]
+        return index.get((comp, idc, slot), frozenset())
+
+    def get_compounds(self, char, length):
+        if not length:
+            return ()
+        buckets = self.compound_index["buckets"]
+        if buckets is not None:
+            return buckets[length].get(char, ())
+        return tuple(comp for comp in self.meta(char).get("compounds", ()) if len(comp) == length)
+
+    def get_phrase_count(self, char, length):
+        i = self.column_store.ids.get(char)
+        return 0 if i is None else int(self.compound_index["counts"][length][i])
+
+    def candidates(self, comp, include=(), exclude=(), depth=0, position=None, outermost=False):
+        """IDs of characters containing comp under the depth, query and position filters."""
+        ids = np.asarray(self.get_containing_ids(comp, depth), dtype=np.int64)
+        if include or exclude:
+            ids = ids[np.isin(ids, self.search_component_ids((comp,) + tuple(include), exclude, depth))]
+        if position is not None:
+            idc, slot = position
+            positioned = self.get_positioned_characters(comp, idc, slot, outermost)
+            ids = ids[np.isin(ids, self.column_store.ids_of(positioned))]
+        return ids
+
+    def results(self, comp, include=(), exclude=(), depth=0, position=None, outermost=False,
+                idc=NO_FILTER, radical=NO_FILTER, length=0, order="strokes"):
+        """Ordered result IDs and the compounds they list, in export order.
+
+        length 0 keeps every character; 2-4 keeps those with phrases of that length.
+        order is "strokes", or "phrases" for most phrases first.
+        """
+        columns = self.column_store
+        counts = self.compound_index["counts"][length]
+        result_ids = columns.sort_by_strokes(columns.select(
+            self.candidates(comp, include, exclude, depth, position, outermost), radical=radical, idc=idc
+        ))
+        if length:
+            result_ids = result_ids[counts[result_ids] > 0]
+        if order == "phrases":
+            result_ids = result_ids[np.argsort(-counts[result_ids], kind="stable")]
+        result_ids.setflags(write=False)
+        compounds = tuple(compound for char in columns.to_chars(result_ids) for compound in self.get_compounds(char, length))
+        return result_ids, compounds
+
+    def client_payload(self, comp, include=(), exclude=(), depth=0, position=None, outermost=False):
+        """comp's candidates in stroke order as parallel columns, for filtering in the browser.
+
+        idc holds IDC codes indexing idcs; radical holds indexes into radicals (-1 for
+        none); compounds[n] holds each character's n-character compounds, sorted and
+        space-joined; phrases is the count of compounds of any length.
+        """
+        columns = self.column_store
+        ids = columns.sort_by_strokes(columns.select(self.candidates(comp, include, exclude, depth, position, outermost)))
+        chars = columns.to_chars(ids)
+        radical_ids = columns.radical_ids[ids]
+        used = np.unique(radical_ids[radical_ids >= 0])
+        renumber = np.full(len(columns.radicals) + 1, -1, dtype=np.int64)
+        renumber[used] = np.arange(len(used))  # the extra last slot maps radical ID -1 to -1
+        return {
+            "chars": chars,
+            "strokes": columns.strokes[ids].tolist(),
+            "idcs": [""] + [IDC_BY_CODE[code] for code in sorted(IDC_BY_CODE)],
+            "idc": columns.idc_codes[ids].tolist(),
+            "radicals": [columns.radicals[r] for r in used.tolist()],
+            "radical": renumber[radical_ids].tolist(),
+            "phrases": self.compound_index["counts"][0][ids].tolist(),
+            "compounds": {n: [" ".join(sorted(self.get_compounds(c, n))) for c in chars] for n in PHRASE_LENGTHS},
+        }
+
+    def format_label(self, char):
+        """The dropdown label for char."""
+        meta = self.meta(char)
+        strokes = self.get_stroke_count(char)
+        definition = self.clean_field(meta.get("definition", "No definition available"))
+        return (
+            f"{char} (Pinyin: {self.clean_field(meta.get('pinyin', '—'))}, Strokes: {strokes or 'unknown'}, "
+            f"Radical: {self.clean_field(meta.get('radical', '—'))}, Decomposition: {self.format_decomposition(char)}, "
+            f"Definition: {definition}, Etymology: {self.get_etymology_text(meta)})"
+        )
+
+    def format_labels(self, char):
+        """Build the dropdown label and the card details HTML for char."""
+        meta = self.meta(char)
+        strokes = self.get_stroke_count(char)
+        pinyin = self.clean_field(meta.get("pinyin", "—"))
+        radical = self.clean_field(meta.get("radical", "—"))
+        decomposition = self.format_decomposition(char)
+        definition = self.clean_field(meta.get("definition", "No definition available"))
+        etymology = self.get_etymology_text(meta)
+        label = self.format_label(char)
+        fields = {
+            "Pinyin": pinyin,
+            "Strokes": f"{strokes} strokes" if strokes is not None else "unknown strokes",
+            "Radical": radical,
+            "Decomposition": decomposition,
+            "Definition": definition,
+            "Etymology": etymology
+        }
+        details = " ".join(f"<strong>{k}:</strong> {v}" for k, v in fields.items())
+        return label, details
+
+    def label_table(self):
+        """Every entry's dropdown label and card details, formatted on first use.
+
+        The dropdowns need every label on each rerun. For a lazy map both tables stay
+        empty, so no definition or etymology is held for every entry: labels are read
+        through cached_label for the options a dropdown shows, and cards through
+        cached_labels.
+        """
+        if self._label_table is None:
+            labels, details = {}, {}
+            if not self.lazy_text:
+                for char in self.component_map:
+                    labels[char], details[char] = self.format_labels(char)
+            self._label_table = {"labels": labels, "details": details}
+        return self._label_table
+
+    def text_index(self):
+        """The pinyin, definition and etymology index, built on first search."""
+        if self._text_index is None:
+            self._text_index = TextIndex(self.component_map, self.decomposition_index["chars"])
+        return self._text_index
+
+    def search_text(self, text, limit=50):
+        """Characters whose pinyin, definition or etymology match text, best match first."""
+        ids, _ = self.text_index().search(text, limit)
+        return self.column_store.to_chars(ids)
+
+    def graph(self):
+        """The decomposition graph for path, shared-component and sibling queries, built on first use."""
+        if self._graph is None:
+            self._graph = DecompositionGraph(self.decomposition_index, self.containment_index)
+        return self._graph
+
+    def decomposition_path(self, first, second):
+        """[(char, direction into it)] along the shortest chain of decompositions from first
+        to second, where direction is DOWN into a component and UP into a container, or
+        None if no chain connects them."""
+        ids = self.decomposition_index["ids"]
+        if first not in ids or second not in ids:
+            return None
+        path = self.graph().shortest_path(ids[first], ids[second])
+        chars = self.decomposition_index["chars"]
+        return None if path is None else [(chars[i], direction) for i, direction in path]
+
+    def common_components(self, first, second):
+        """[(component, depth in first, depth in second)] of the lowest components both share."""
+        ids = self.decomposition_index["ids"]
+        if first not in ids or second not in ids:
+            return []
+        chars = self.decomposition_index["chars"]
+        return [(chars[i], a, b) for i, a, b in self.graph().common_components(ids[first], ids[second])]
+
+    def siblings(self, char, min_shared=2, depth=1):
+        """(ids, shared counts) of the characters sharing at least min_shared of char's components."""
+        char_id = self.decomposition_index["ids"].get(char)
+        if char_id is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return self.graph().siblings(char_id, min_shared, depth)
+
+    def describe(self, char, length=0):
+        """Plain fields for one result character, as written by the batch CLI."""
+        meta = self.meta(char)
+        return {
+            "char": char,
+            "pinyin": self.clean_field(meta.get("pinyin", "—")),
+            "strokes": self.get_stroke_count(char),
+            "radical": self.clean_field(meta.get("radical", "—")),
+            "decomposition": self.format_decomposition(char),
+            "definition": self.clean_field(meta.get("definition", "No definition available")),
+            "etymology": self.get_etymology_text(meta),
+            "compounds": list(self.get_compounds(char, length)),
+        }
+
+# Export
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "TSV": ("tsv", "text/tab-separated-values"),
+    "Anki": ("txt", "text/plain"),
+}
+EXPORT_COLUMNS = ("character", "compound", "pinyin", "definition")
+
+def export_rows(engine, ids, length):
+    """(character, compound, pinyin, definition) for every listed compound of the result
+    ids, in result order; one row per character with an empty compound when length is 0."""
+    for char in engine.column_store.to_chars(ids):
+        meta = engine.meta(char)
+        pinyin = engine.clean_field(meta.get("pinyin", "—"))
+        definition = engine.clean_field(meta.get("definition", "—"))
+        if not length:
+            yield char, "", pinyin, definition
+        for compound in engine.get_compounds(char, length) if length else ():
+            yield char, compound, pinyin, definition
+
+def export_lines(rows, fmt):
+    """Encode rows one line at a time as CSV, TSV or an Anki plain-text import.
+
+    Anki notes use the compound (or character) as the front and the source character,
+    its pinyin and definition as the back; the header lines set Anki's import options.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter="," if fmt == "CSV" else "\t", lineterminator="\n")
+    if fmt == "Anki":
+        yield "#separator:tab\n#html:false\n#columns:Front\tBack\n"
+    else:
+        writer.writerow(EXPORT_COLUMNS)
+    for char, compound, pinyin, definition in rows:
+        if fmt == "Anki":
+            writer.writerow((compound or char, f"{char} {pinyin}: {definition}"))
+        else:
+            writer.writerow((char, compound, pinyin, definition))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+# Batch CLI
+def parse_query_line(line):
+    """A JSONL query object, or a bare component query such as 氵木-口."""
+    line = line.strip()
+    return json.loads(line) if line.startswith("{") else {"query": line}
+
+def run_query(engine, spec):
+    if not isinstance(spec, dict) or not isinstance(spec.get("query", ""), str):
+        return {"query": spec, "error": 'A query must be an object with a string "query"'}
+    include, exclude = parse_component_query(spec.get("query", ""))
+    if not include:
+        return {"query": spec, "error": "No component given"}
+    unknown = [c for c in include + exclude if c not in engine.decomposition_index["ids"]]
+    if unknown:
+        return {"query": spec, "error": f"Unknown component(s): {' '.join(unknown)}"}
+    position = spec.get("position")
+    length = int(spec.get("phrases", 0))
+    result_ids, _ = engine.results(
+        include[0], include[1:], exclude,
+        depth=int(spec.get("depth", 0)),
+        position=tuple(position) if position else None,
+        outermost=bool(spec.get("outermost", False)),
+        idc=spec.get("idc", NO_FILTER),
+        radical=spec.get("radical", NO_FILTER),
+        length=length,
+        order=spec.get("order", "strokes"),
+    )
+    return {
+        "query": spec,
+        "count": len(result_ids),
+        "results": [engine.describe(char, length) for char in engine.column_store.to_chars(result_ids)],
+    }
+
+def run_chunk(engine, lines):
+    out = []
+    for line in lines:
+        try:
+            result = run_query(engine, parse_query_line(line))
+        except (ValueError, TypeError, KeyError) as e:
+            result = {"query": line.strip(), "error": f"{type(e).__name__}: {e}"}
+        out.append(json.dumps(result, ensure_ascii=False))
+    return out
+
+def chunked(lines, size):
+    lines = (line for line in lines if line.strip())
+    while True:
+        chunk = list(islice(lines, size))
+        if not chunk:
+            return
+        yield chunk
+
+def load_engine(path):
+    data, report = load_data(path)
+    return QueryEngine(data, normalized=report["normalized"])
+
+_worker_engine = None
+
+def _init_worker(path):
+    global _worker_engine
+    _worker_engine = load_engine(path)
+
+def _run_worker_chunk(lines):
+    return run_chunk(_worker_engine, lines)
+
+def stream_results(path, lines, workers=1, chunk_size=256):
+    """Yield one JSON line per query, in input order, reading lines lazily.
+
+    With workers > 1 each process builds its own engine and at most 2 * workers chunks
+    are in flight, so memory stays bounded however long the input is.
+    """
+    if workers <= 1:
+        engine = load_engine(path)
+        for chunk in chunked(lines, chunk_size):
+            yield from run_chunk(engine, chunk)
+        return
+    import multiprocessing
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(path,)) as pool:
+        pending = deque()
+        for chunk in chunked(lines, chunk_size):
+            pending.append(pool.apply_async(_run_worker_chunk, (chunk,)))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run component queries in batch and write results as JSONL.")
+    parser.add_argument("queries", nargs="?", default="-", help="query file, one per line (default: stdin)")
+    parser.add_argument("-d", "--data", default=DATA_FILE, help="component map JSON (its compiled artifact is used if fresh)")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=256, help="queries per worker task")
+    args = parser.parse_args(argv)
+    source = sys.stdin if args.queries == "-" else open(args.queries, encoding="utf-8")
+    out = sys.stdout if not args.output else open(args.output, "w", encoding="utf-8")
+    try:
+        for line in stream_results(args.data, source, args.workers, args.chunk_size):
+            out.write(line + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Bounded, thread-safe LRU cache for finished query results, shared by every session.
+
+Entries are evicted least-recently-used first once either the entry count or the
+estimated memory size exceeds its limit, and optionally expire after ttl seconds.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+def estimate_size(value):
+    """Approximate bytes held by value: arrays by buffer size, containers recursively."""
+    if isinstance(value, np.ndarray):
+        # getsizeof already counts the buffer of an array that owns its data
+        return sys.getsizeof(value) + (value.nbytes if value.base is not None else 0)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+class ResultCache:
+    def __init__(self, max_entries=256, max_bytes=64 << 20, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            found = self._entries.get(key)
+            if found is not None and self.ttl is not None and time.monotonic() - found[2] > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                found = None
+            if found is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return found[0]
+
+    def pop(self, key, default=None):
+        """Remove and return the value for key, without counting a hit or a miss."""
+        with self._lock:
+            found = self._entries.get(key)
+            if found is None:
+                return default
+            self._remove(key)
+            if self.ttl is not None and time.monotonic() - found[2] > self.ttl:
+                self.expirations += 1
+                return default
+            return found[0]
+
+    def __contains__(self, key):
+        """Membership without touching the LRU order or the hit counters."""
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, value, size=None):
+        size = estimate_size(value) if size is None else size
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size, time.monotonic())
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss.
+
+        compute runs outside the lock, so two sessions missing on the same key at once
+        may both compute it; the second store simply replaces the first.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
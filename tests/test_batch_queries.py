@@ -0,0 +1,22 @@
+"""The batch CLI's per-line query handling."""
+import json
+
+from query_engine import QueryEngine, freeze, parse_query_line, run_chunk, run_query
+
+COMPONENT_MAP = {
+    "口": {"meta": {"strokes": 3, "radical": "口"}},
+    "木": {"meta": {"strokes": 4, "radical": "木"}},
+    "呆": {"meta": {"strokes": 7, "radical": "口", "decomposition": "⿱口木"}},
+}
+
+def test_malformed_specs_become_error_records():
+    engine = QueryEngine(freeze(COMPONENT_MAP))
+    lines = ['{"query": null}', '{"query": 5}', '{"query": ["口"]}', "{not json", "口"]
+    results = [json.loads(line) for line in run_chunk(engine, lines)]
+    assert [("error" in result) for result in results] == [True, True, True, True, False]
+    assert [item["char"] for item in results[-1]["results"]] == ["呆"]
+
+def test_non_object_spec_is_an_error_record():
+    engine = QueryEngine(freeze(COMPONENT_MAP))
+    assert "error" in run_query(engine, ["口"])
+    assert parse_query_line(" 口 ") == {"query": "口"}
@@ -0,0 +1,40 @@
+"""Paths, shared components and siblings over the decomposition graph."""
+import pytest
+
+from decomposition_graph import DOWN, UP
+from query_engine import QueryEngine, freeze
+
+DECOMPOSITIONS = {
+    "木": "", "目": "", "心": "", "竹": "", "口": "", "水": "",
+    "相": "⿰木目", "想": "⿱相心", "箱": "⿱竹相", "林": "⿰木木", "呆": "⿱口木", "杏": "⿱木口",
+}
+
+@pytest.fixture(scope="module")
+def engine():
+    component_map = {char: {"meta": {"strokes": 4, "radical": char, "decomposition": decomposition}}
+                     for char, decomposition in DECOMPOSITIONS.items()}
+    return QueryEngine(freeze(component_map))
+
+def chars(engine, ids):
+    return [engine.decomposition_index["chars"][i] for i in ids]
+
+def test_shortest_path(engine):
+    assert engine.decomposition_path("想", "目") == [("想", 0), ("相", DOWN), ("目", DOWN)]
+    assert engine.decomposition_path("心", "箱") == [("心", 0), ("想", UP), ("相", DOWN), ("箱", UP)]
+    assert engine.decomposition_path("林", "林") == [("林", 0)]
+    assert engine.decomposition_path("水", "木") is None
+    assert engine.decomposition_path("水", "?") is None
+
+def test_common_components_keep_only_the_lowest(engine):
+    assert engine.common_components("想", "箱") == [("相", 1, 1)]
+    assert sorted(engine.common_components("呆", "杏")) == sorted([("口", 1, 1), ("木", 1, 1)])
+    assert engine.common_components("想", "水") == []
+
+def test_siblings(engine):
+    ids, shared = engine.siblings("呆")
+    assert chars(engine, ids) == ["杏"] and list(shared) == [2]
+    ids, shared = engine.siblings("想", min_shared=1)
+    assert chars(engine, ids) == ["箱"]
+    # At any depth 想 also shares 木 and 目 with 箱 and 相, and 木 with the rest
+    ids, shared = engine.siblings("想", min_shared=1, depth=0)
+    assert chars(engine, ids)[:2] == ["箱", "相"] and list(shared) == [3, 2, 1, 1, 1]
@@ -0,0 +1,79 @@
+"""Fragment-only reruns of the results panel, driven over the app's websocket.
+
+AppTest always reruns the whole script, which re-seeds session state; a browser
+changing a widget inside the results panel reruns only that fragment. These tests
+start the app with `streamlit run` and speak the browser protocol through
+app_client's Session, so widgets that a fragment run stops rendering are exercised.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from app_client import Session, free_port, start_server  # noqa: E402
+from query_engine import DATA_FILE  # noqa: E402
+from synthetic_data import generate_component_map, write_component_map  # noqa: E402
+
+TIMEOUT = 60
+
+@pytest.fixture(scope="module")
+def app_url():
+    with tempfile.TemporaryDirectory() as workdir:
+        write_component_map(os.path.join(workdir, DATA_FILE), generate_component_map(2000, seed=0))
+        port = free_port()
+        process = start_server(workdir, port, TIMEOUT)
+        try:
+            yield f"ws://127.0.0.1:{port}/_stcore/stream"
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+def run_steps(url, steps):
+    """Open a session, then run each step(session) in turn; returns the session."""
+    async def visit():
+        session = Session(url, TIMEOUT)
+        await session.connect()
+        try:
+            await session.rerun("open")
+            for step in steps:
+                assert await step(session) is not False
+        finally:
+            await session.close()
+        return session
+    return asyncio.run(visit())
+
+def last_option(options):
+    return options[-1]
+
+def shown_value(session, key):
+    """The option a selectbox or radio displays after the session's last rerun."""
+    proto = session.widget(key)[2]
+    return proto.raw_value if proto.set_value else proto.options[proto.default]
+
+def test_client_filtering_survives_fragment_reruns(app_url):
+    session = run_steps(app_url, [
+        lambda s: s.set_value("client filtering on", "client_filtering", bool_value=True),
+        lambda s: s.set_option("depth", "containment_depth", last_option),
+        lambda s: s.set_option("depth again", "containment_depth", lambda options: options[1]),
+        lambda s: s.set_value("client filtering off", "client_filtering", bool_value=False),
+        lambda s: s.set_option("depth after", "containment_depth", last_option),
+        lambda s: s.set_option("output type", "display_mode_widget", last_option),
+    ])
+    assert session.fragments[session.widget("containment_depth")[0]], "depth should rerun only the fragment"
+    assert session.errors == []
+
+def test_output_settings_kept_across_client_mode(app_url):
+    session = run_steps(app_url, [
+        lambda s: s.set_option("output type", "display_mode_widget", last_option),
+        lambda s: s.set_option("order", "result_order_widget", last_option),
+        lambda s: s.set_value("client filtering on", "client_filtering", bool_value=True),
+        lambda s: s.set_option("depth", "containment_depth", last_option),
+        lambda s: s.set_value("client filtering off", "client_filtering", bool_value=False),
+    ])
+    assert session.errors == []
+    assert shown_value(session, "display_mode_widget") == "4-Character Phrases"
+    assert shown_value(session, "result_order_widget") == "Most phrases"
@@ -0,0 +1,70 @@
+"""QueryEngine.updated() against a fresh build of the same map."""
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from query_engine import QueryEngine, freeze  # noqa: E402
+from synthetic_data import generate_component_map  # noqa: E402
+
+def edited_maps(seed):
+    """(old map, new map, changed keys): the new map drops, modifies and inserts entries,
+    some inserted in the middle of the key order and some used only as components."""
+    rng = random.Random(seed)
+    full = generate_component_map(600, seed=seed)
+    keys = list(full)
+    held_back = set(rng.sample(keys[100:500], 15))
+    old = {char: entry for char, entry in full.items() if char not in held_back}
+    new = {char: entry for char, entry in full.items()}
+    removed = rng.sample([c for c in keys[300:] if c not in held_back], 10)
+    for char in removed:
+        del new[char]
+    modified = rng.sample([c for c in keys[30:] if c in new and c not in held_back], 20)
+    for char in modified:
+        meta = dict(new[char]["meta"])
+        meta["decomposition"] = "⿰" + rng.choice(keys[:30]) + rng.choice(["丂", "丄", "龻"])
+        meta["strokes"] = rng.randint(1, 30)
+        meta["radical"] = rng.choice(keys[:5])
+        meta["compounds"] = [char + rng.choice(keys), rng.choice(keys) + char + rng.choice(keys)]
+        new[char] = {"meta": meta, "related_characters": []}
+    changed = sorted(held_back | set(removed) | set(modified))
+    return old, new, changed
+
+def observed(engine, component_map):
+    """Everything a session can see of an engine, keyed by character rather than ID."""
+    columns = engine.column_store
+    chars = [c for c in component_map if len(c) == 1]
+    sets = lambda index: {key: frozenset(value) for key, value in index.items() if value}  # noqa: E731
+    return {
+        "containers": {c: sorted(engine.get_containing_characters(c, depth)) for c in chars for depth in (0, 1, 2)},
+        "components": {c: sorted(engine.get_all_components(c, 5)) for c in chars},
+        "by_strokes": sets(engine.facet_index["by_strokes"]),
+        "by_radical": sets(engine.facet_index["by_radical"]),
+        "by_idc": sets(engine.facet_index["by_idc"]),
+        "anywhere": sets(engine.position_index["anywhere"]),
+        "outermost": sets(engine.position_index["outermost"]),
+        "listing": columns.to_chars(columns.sort_by_strokes(np.flatnonzero(columns.mask()))),
+        "results": {c: columns.to_chars(engine.results(c, length=2)[0]) for c in chars[:200]},
+        "phrases": {c: [engine.get_phrase_count(c, n) for n in (0, 2, 3, 4)] for c in chars},
+        "compounds": {c: engine.get_compounds(c, 3) for c in chars},
+    }
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_updated_matches_fresh_build(seed):
+    old, new, changed = edited_maps(seed)
+    updated = QueryEngine(freeze(old)).updated(freeze(new), changed)
+    fresh = QueryEngine(freeze(new))
+    got, expected = observed(updated, new), observed(fresh, new)
+    for name in expected:
+        assert got[name] == expected[name], name
+
+def test_updated_leaves_the_old_engine_untouched():
+    old, new, changed = edited_maps(3)
+    engine = QueryEngine(freeze(old))
+    before = observed(engine, old)
+    engine.updated(freeze(new), changed)
+    assert observed(engine, old) == before
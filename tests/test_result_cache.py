@@ -0,0 +1,56 @@
+"""ResultCache eviction by entry count, bytes and age."""
+import numpy as np
+
+import result_cache
+from result_cache import ResultCache, estimate_size
+
+def test_least_recently_used_is_evicted_first():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache and cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"], stats["hits"], stats["misses"]) == (2, 1, 3, 0)
+
+def test_byte_limit():
+    cache = ResultCache(max_entries=10, max_bytes=100)
+    cache.put("a", "x", size=60)
+    cache.put("b", "y", size=30)
+    cache.put("c", "z", size=30)
+    assert "a" not in cache and cache.stats()["bytes"] == 60
+    cache.put("huge", "w", size=101)
+    assert "huge" not in cache and "b" in cache and "c" in cache
+    # Replacing a key releases its old size
+    cache.put("b", "y", size=10)
+    assert cache.stats()["bytes"] == 40
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: now[0])
+    cache = ResultCache(ttl=5)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    now[0] += 4
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None and cache.pop("b") is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["expirations"], stats["bytes"]) == (0, 2, 0)
+
+def test_pop_and_get_or_compute():
+    cache = ResultCache()
+    calls = []
+    compute = lambda: calls.append(1) or "value"  # noqa: E731
+    assert cache.get_or_compute("k", compute) == cache.get_or_compute("k", compute) == "value"
+    assert len(calls) == 1
+    assert cache.pop("k") == "value" and cache.pop("k", "gone") == "gone"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_estimate_size_counts_array_buffers_once():
+    owner = np.zeros(1000, dtype=np.int64)
+    view = owner[:500]
+    assert estimate_size(owner) >= 8000
+    assert estimate_size(view) >= 4000
+    assert estimate_size((owner, [view])) > estimate_size(owner) + estimate_size(view)
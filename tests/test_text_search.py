@@ -0,0 +1,39 @@
+"""TextIndex matching: pinyin forms, prefixes and trigram typos."""
+from text_search import TextIndex, pinyin_forms
+
+COMPONENT_MAP = {
+    "木": {"meta": {"pinyin": ["mù"], "definition": "tree; wood", "etymology": {"hint": "A tree with roots"}}},
+    "目": {"meta": {"pinyin": ["mù"], "definition": "eye"}},
+    "女": {"meta": {"pinyin": ["nǚ"], "definition": "woman, female"}},
+    "马": {"meta": {"pinyin": ["mǎ"], "definition": "horse"}},
+    "森": {"meta": {"pinyin": ["sēn"], "definition": "forest; full of trees"}},
+}
+
+def search(text):
+    chars = list(COMPONENT_MAP)
+    ids, _ = TextIndex(COMPONENT_MAP, chars).search(text)
+    return [chars[i] for i in ids]
+
+def test_pinyin_forms():
+    assert pinyin_forms("mù") == ("mù", "mu4", "mu", "4")
+    assert pinyin_forms("nǚ") == ("nǚ", "nv3", "nu", "3")
+    assert pinyin_forms("mu4") == ("mu4", "mu4", "mu", "4")
+
+def test_toned_numbered_and_toneless_pinyin():
+    assert search("mù") == search("mu4") == ["木", "目"]
+    assert search("mu") == ["木", "目"]
+    assert search("ma3") == ["马"]
+    assert search("ma4") == []
+    assert search("nv3") == ["女"]
+
+def test_definition_prefix_and_etymology():
+    assert search("hors") == ["马"]
+    assert search("roots") == ["木"]
+    # Every word must match; only the last one is expanded as a prefix
+    assert search("tree wo") == ["木"]
+    assert search("wo tree") == []
+
+def test_trigram_typos():
+    assert search("forrest") == ["森"]
+    assert search("womn") == ["女"]
+    assert search("hx") == []  # too short to match loosely
@@ -0,0 +1,69 @@
+"""validate_data normalization, related characters and issue reporting."""
+import json
+
+import pytest
+
+from validate_data import main, normalize_entry, validate
+
+DATA = {
+    "木": {"meta": {"strokes": "4", "radical": ["木"], "pinyin": ["mù", "mù", ""]}, "related_characters": ["林"]},
+    "目": {"meta": {"strokes": 5, "radical": "目"}, "related_characters": ["木"]},
+    "相": {"meta": {"strokes": 9, "radical": "目", "decomposition": "⿰木目", "IDC": "⿱"}},
+    "想": {"meta": {"strokes": 13, "radical": "心", "decomposition": "⿱相心"}},
+    "林": {"meta": {"strokes": 8, "radical": "木", "decomposition": "⿰木?"}},
+    "坏": {"meta": {"radical": "土", "decomposition": "⿰土"}},
+    "乱": "not an entry",
+}
+
+@pytest.fixture(scope="module")
+def validated():
+    return validate(DATA)
+
+def test_normalize_entry():
+    entry, issues, normalized, direct = normalize_entry("木", DATA["木"], set(DATA))
+    assert entry["meta"]["strokes"] == 4 and entry["meta"]["radical"] == "木"
+    assert entry["meta"]["pinyin"] == ["mù"]
+    assert set(normalized) == {"strokes", "radical", "pinyin"}
+    assert issues == [] and direct == []
+
+def test_related_characters_at_any_depth(validated):
+    _, related, _ = validated
+    assert related["木"] == ["相", "想"]
+    assert related["目"] == ["相", "想"]
+    assert related["相"] == ["想"]
+    assert related["想"] == []
+
+def test_issue_kinds(validated):
+    metas, _, report = validated
+    kinds = {(item["kind"], item["char"]) for item in report["issues"]}
+    assert kinds >= {
+        ("related_not_containing", "木"), ("related_not_containing", "目"),
+        ("containing_not_related", "木"), ("containing_not_related", "目"),
+        ("idc_mismatch", "相"), ("missing_component", "想"), ("invalid_component", "林"),
+        ("missing_strokes", "坏"), ("malformed_decomposition", "坏"), ("missing_component", "坏"),
+        ("invalid_entry", "乱"),
+    }
+    assert report["errors"] == sum(item["type"] == "error" for item in report["issues"])
+    assert json.loads(metas["林"])["decomposition"] == ""
+
+def test_workers_give_identical_output(validated):
+    metas, related, report = validate(DATA, workers=2, chunk_size=2)
+    assert (metas, related) == validated[:2]
+    assert report["issues"] == validated[2]["issues"]
+
+def test_cleaned_output(tmp_path, validated):
+    source, output, report = tmp_path / "map.json", tmp_path / "clean.json", tmp_path / "report.json"
+    source.write_text(json.dumps(DATA, ensure_ascii=False), encoding="utf-8")
+    assert main([str(source), "-o", str(output), "-r", str(report)]) == 0
+    assert main([str(source), "-r", str(report), "--strict"]) == 1
+    cleaned = json.loads(output.read_text(encoding="utf-8"))
+    assert list(cleaned) == list(DATA)
+    assert cleaned["木"] == {"meta": json.loads(validated[0]["木"]), "related_characters": ["相", "想"]}
+
+def test_compile_needs_an_output(tmp_path, capsys):
+    source = tmp_path / "map.json"
+    source.write_text(json.dumps(DATA, ensure_ascii=False), encoding="utf-8")
+    with pytest.raises(SystemExit) as exit_info:
+        main([str(source), "--compile"])
+    assert exit_info.value.code == 2
+    assert "--compile needs -o" in capsys.readouterr().err
@@ -0,0 +1,184 @@
+"""Ranked text search over pinyin, definitions and etymology.
+
+TextIndex keeps one inverted index per field, term -> sorted uint32 array of character
+ids, plus a sorted vocabulary for prefix matches and a trigram index over it for typo
+tolerance. Pinyin is indexed three ways, so "mù", "mu4" and "mu" all find 木. Every
+query term must match some field; a character's score is the sum, over query terms,
+of the best field weight it matched, scaled down for prefix and fuzzy matches.
+
+Nothing here imports Streamlit.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+# Field weights; a toned pinyin match is the most specific
+FIELD_WEIGHTS = {
+    "pinyin_toned": 5.0,
+    "pinyin": 4.0,
+    "definition": 3.0,
+    "hint": 1.5,
+    "details": 1.0,
+}
+TEXT_FIELDS = ("definition", "hint", "details")
+PREFIX_FACTOR = 0.6
+FUZZY_FACTOR = 0.5
+FUZZY_MIN_LENGTH = 3
+FUZZY_MIN_SIMILARITY = 0.35
+PREFIX_LIMIT = 64
+STOPWORDS = frozenset({"a", "an", "and", "as", "at", "by", "for", "in", "is", "of", "on", "or", "the", "to", "with"})
+
+TONE_MARKS = {"̄": "1", "́": "2", "̌": "3", "̀": "4"}
+WORD = re.compile(r"[^\W_]+")
+
+def as_list(value):
+    if value is None:
+        return []
+    return [str(v) for v in value] if isinstance(value, (list, tuple)) else [str(value)]
+
+def pinyin_forms(syllable):
+    """(toned, numbered, toneless, tone) forms of one syllable; ü is written v when numbered."""
+    toned = unicodedata.normalize("NFC", syllable.lower())
+    tone, letters = "", []
+    for ch in unicodedata.normalize("NFD", toned):
+        if ch in TONE_MARKS:
+            tone = TONE_MARKS[ch]
+        elif ch == "̈":
+            letters[-1:] = ["v"] if letters[-1:] == ["u"] else letters[-1:]
+        elif not unicodedata.combining(ch):
+            letters.append(ch)
+    plain = "".join(letters)
+    if plain[-1:].isdigit():
+        # Already numbered, e.g. "mu4"
+        tone, plain = plain[-1], plain[:-1]
+    return toned, plain + tone, plain.replace("v", "u"), tone
+
+def english_terms(text):
+    words = WORD.findall(unicodedata.normalize("NFKD", text.lower()))
+    return [w for w in ("".join(ch for ch in word if not unicodedata.combining(ch)) for word in words)
+            if w and w not in STOPWORDS]
+
+def trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def entry_terms(meta):
+    """{field: set of terms} for one entry's meta."""
+    etymology = meta.get("etymology", {}) or {}
+    terms = {field: set() for field in FIELD_WEIGHTS}
+    for value in as_list(meta.get("pinyin")):
+        for syllable in WORD.findall(value):
+            toned, numbered, toneless, _ = pinyin_forms(syllable)
+            terms["pinyin_toned"].update((toned, numbered))
+            terms["pinyin"].add(toneless)
+    for value in as_list(meta.get("definition")):
+        terms["definition"].update(english_terms(value))
+    for field in ("hint", "details"):
+        for value in as_list(etymology.get(field)):
+            terms[field].update(english_terms(value))
+    return terms
+
+def query_terms(text):
+    """[(term, fields)] for a query; toned or numbered syllables only match toned pinyin."""
+    terms = []
+    for word in WORD.findall(text):
+        _, numbered, _, tone = pinyin_forms(word)
+        if tone:
+            # Tone mark or tone number given: "mù", "mu4"
+            terms.append((numbered, ("pinyin_toned",)))
+        else:
+            for term in english_terms(word):
+                terms.append((term, ("pinyin",) + TEXT_FIELDS))
+    return terms
+
+class TextIndex:
+    def __init__(self, component_map, chars):
+        """chars: the id -> char list the other indexes use; ids missing from the map are skipped."""
+        self.size = len(chars)
+        lists = {field: {} for field in FIELD_WEIGHTS}
+        for i, char in enumerate(chars):
+            entry = component_map.get(char)
+            if entry is None:
+                continue
+            for field, terms in entry_terms(entry.get("meta", {}) or {}).items():
+                postings = lists[field]
+                for term in terms:
+                    postings.setdefault(term, []).append(i)
+        self.postings = {
+            field: {term: np.array(ids, dtype=np.uint32) for term, ids in postings.items()}
+            for field, postings in lists.items()
+        }
+        self.vocabulary = sorted({term for postings in lists.values() for term in postings})
+        self.trigram_index = {}
+        for term_id, term in enumerate(self.vocabulary):
+            for gram in trigrams(term):
+                self.trigram_index.setdefault(gram, []).append(term_id)
+
+    def prefix_terms(self, prefix):
+        start = bisect_left(self.vocabulary, prefix)
+        found = []
+        for term in self.vocabulary[start:start + PREFIX_LIMIT]:
+            if not term.startswith(prefix):
+                break
+            if term != prefix:
+                found.append(term)
+        return found
+
+    def fuzzy_terms(self, term):
+        """Vocabulary terms whose trigram Jaccard similarity to term is high enough."""
+        grams = trigrams(term)
+        shared = {}
+        for gram in grams:
+            for term_id in self.trigram_index.get(gram, ()):
+                shared[term_id] = shared.get(term_id, 0) + 1
+        found = []
+        for term_id, count in shared.items():
+            candidate = self.vocabulary[term_id]
+            similarity = count / (len(grams) + len(trigrams(candidate)) - count)
+            if similarity >= FUZZY_MIN_SIMILARITY and candidate != term:
+                found.append((candidate, similarity))
+        return found
+
+    def term_scores(self, term, fields, expand_prefix):
+        """Best score per id for one query term, or None if nothing matched."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        matched = False
+
+        def add(candidate, factor):
+            nonlocal matched
+            for field in fields:
+                ids = self.postings[field].get(candidate)
+                if ids is not None:
+                    np.maximum.at(scores, ids, FIELD_WEIGHTS[field] * factor)
+                    matched = True
+
+        add(term, 1.0)
+        if expand_prefix and "pinyin_toned" not in fields:
+            for candidate in self.prefix_terms(term):
+                add(candidate, PREFIX_FACTOR)
+        if not matched and len(term) >= FUZZY_MIN_LENGTH:
+            for candidate, similarity in self.fuzzy_terms(term):
+                add(candidate, FUZZY_FACTOR * similarity)
+        return scores if matched else None
+
+    def search(self, text, limit=50):
+        """(ids, scores) of the best matches, highest score first, ties in id order.
+
+        The last query word is also matched as a prefix, so results appear while typing.
+        """
+        terms = query_terms(text)
+        if not terms or not self.size:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        total = np.zeros(self.size, dtype=np.float32)
+        hits = np.ones(self.size, dtype=bool)
+        for n, (term, fields) in enumerate(terms):
+            scores = self.term_scores(term, fields, expand_prefix=n == len(terms) - 1)
+            if scores is None:
+                return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+            hits &= scores > 0
+            total += scores
+        ids = np.flatnonzero(hits)
+        ids = ids[np.argsort(-total[ids], kind="stable")][:limit]
+        return ids, total[ids]
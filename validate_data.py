@@ -0,0 +1,283 @@
+"""Offline validation and normalization of enhanced_component_map_with_etymology.json.
+
+    python validate_data.py enhanced_component_map_with_etymology.json -o cleaned.json --report report.json -w 4
+
+Entries are normalized and checked in parallel chunks on a process pool. The main
+process then rebuilds related_characters from the decompositions, as every character
+containing the entry at any depth, and compares them with what the file listed. The
+cleaned map has one type per field:
+- strokes is a positive int or null;
+- pinyin is a list of readings;
+- definition, radical, decomposition, IDC, and the etymology hint and details
+  are strings;
+- compounds and related_characters are lists of distinct strings.
+Absent fields stay absent. Decompositions containing '?' are blanked, as the app
+does at load time.
+
+The report is JSON. It holds issue and normalization counts, and one
+{"type", "kind", "char", "message"} record per issue. Errors are unparseable entries,
+malformed decompositions and components missing from the map; the rest are warnings.
+
+With --compile the cleaned map written by -o is also compiled, next to it and named
+after it, and the app serves it without coercing fields on each read. The app only
+looks for the artifact of its data file, so -o should be that file.
+
+Nothing here imports Streamlit.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+from compiled_store import ETYMOLOGY_FIELDS, artifact_path_for, compile_artifact, normalize_strokes, normalize_text
+from query_engine import DATA_FILE, IDC_CHARS, closure, parse_ids
+
+ERROR_KINDS = frozenset({"malformed_decomposition", "missing_component", "invalid_entry"})
+TEXT_FIELDS = ("definition", "radical", "decomposition", "IDC")
+
+def issue(kind, char, message):
+    return {"type": "error" if kind in ERROR_KINDS else "warning", "kind": kind, "char": char, "message": message}
+
+def distinct_strings(values):
+    """Non-empty strings from a list or a single value, first occurrence kept."""
+    if values is None:
+        return []
+    items = values if isinstance(values, (list, tuple)) else [values]
+    return list(dict.fromkeys(s for s in (normalize_text(v) for v in items) if s))
+
+# Per-entry normalization
+def normalize_entry(char, entry, keys):
+    """(cleaned entry, issues, normalized field names, direct components) for one entry.
+
+    keys is the set of every character in the map, for the missing-component check.
+    """
+    issues, normalized = [], []
+    if not isinstance(entry, dict) or not isinstance(entry.get("meta", {}), dict):
+        issues.append(issue("invalid_entry", char, f"Entry for {char} is not an object with a meta object"))
+        entry = {}
+    meta = entry.get("meta") or {}
+    cleaned = {}
+
+    strokes = normalize_strokes(meta.get("strokes"))
+    if not strokes:
+        issues.append(issue("missing_strokes", char, f"No usable stroke count for {char}: {meta.get('strokes')!r}"))
+    if type(meta.get("strokes")) is not int or not strokes:
+        normalized.append("strokes")
+    cleaned["strokes"] = strokes or None
+
+    if "pinyin" in meta:
+        pinyin = distinct_strings(meta["pinyin"])
+        if pinyin != meta["pinyin"]:
+            normalized.append("pinyin")
+        cleaned["pinyin"] = pinyin
+
+    for field in TEXT_FIELDS:
+        if field in meta and meta[field] is not None:
+            value = normalize_text(meta[field])
+            if value != meta[field]:
+                normalized.append(field)
+            cleaned[field] = value
+    if not cleaned.get("radical"):
+        issues.append(issue("missing_radical", char, f"No radical for {char}"))
+
+    decomposition = cleaned.get("decomposition", "")
+    direct = []
+    if "?" in decomposition:
+        issues.append(issue("invalid_component", char, f"Invalid component '?' in decomposition for {char}: {decomposition}"))
+        cleaned["decomposition"] = decomposition = ""
+    elif decomposition and decomposition != char:
+        tree, end = parse_ids(decomposition)
+        if end != len(decomposition):
+            issues.append(issue("malformed_decomposition", char, f"Malformed decomposition for {char}: {decomposition}"))
+        direct = list(dict.fromkeys(comp for comp in decomposition if comp not in IDC_CHARS and comp != char))
+        for comp in direct:
+            if comp not in keys:
+                issues.append(issue("missing_component", char, f"Component {comp} of {char} is not in the map"))
+        idc = cleaned.get("IDC", "")
+        if idc and isinstance(tree, tuple) and idc != tree[0]:
+            issues.append(issue("idc_mismatch", char, f"IDC {idc} of {char} differs from its decomposition {decomposition}"))
+
+    etymology = meta.get("etymology")
+    if etymology is not None:
+        if not isinstance(etymology, dict):
+            normalized.append("etymology")
+            etymology = {}
+        cleaned["etymology"] = {}
+        for field in ETYMOLOGY_FIELDS:
+            if etymology.get(field) is not None:
+                value = normalize_text(etymology[field])
+                if value != etymology[field]:
+                    normalized.append(f"etymology.{field}")
+                cleaned["etymology"][field] = value
+
+    if "compounds" in meta:
+        compounds = distinct_strings(meta["compounds"])
+        if compounds != meta["compounds"]:
+            normalized.append("compounds")
+        cleaned["compounds"] = compounds
+
+    # Unknown meta fields are carried over unchanged
+    for field, value in meta.items():
+        if field not in cleaned and field not in ("strokes", "pinyin", "etymology", "compounds") + TEXT_FIELDS:
+            cleaned[field] = value
+    return {"meta": cleaned, "related_characters": entry.get("related_characters")}, issues, normalized, direct
+
+def normalize_items(items, keys):
+    """normalize_entry over (char, entry) pairs, with each cleaned meta already encoded as JSON
+    so workers hand back strings instead of pickled dicts."""
+    results = []
+    for char, entry in items:
+        cleaned, issues, normalized, direct = normalize_entry(char, entry, keys)
+        results.append((json.dumps(cleaned["meta"], ensure_ascii=False), issues, normalized, direct))
+    return results
+
+_worker_items = None
+_worker_keys = None
+
+def _init_worker(items, keys):
+    # Inherited without pickling when the pool forks
+    global _worker_items, _worker_keys
+    _worker_items, _worker_keys = items, keys
+
+def _normalize_worker_range(bounds):
+    return normalize_items(_worker_items[bounds[0]:bounds[1]], _worker_keys)
+
+def normalized_entries(data, workers=1, chunk_size=2048):
+    """Yield (meta JSON, issues, normalized fields, direct components) per entry, in map order."""
+    items, keys = list(data.items()), frozenset(data)
+    ranges = [(start, start + chunk_size) for start in range(0, len(items), chunk_size)]
+    if workers <= 1:
+        for start, end in ranges:
+            yield from normalize_items(items[start:end], keys)
+        return
+    import gc
+    import multiprocessing
+    # Keep the workers' collector off the inherited map, or every page of it gets copied
+    gc.freeze()
+    try:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(items, keys)) as pool:
+            for results in pool.imap(_normalize_worker_range, ranges):
+                yield from results
+    finally:
+        gc.unfreeze()
+
+# Whole-map checks
+def rebuild_related(data, direct_components):
+    """related_characters as every character containing each entry at any depth, nearest
+    first, per the cleaned decompositions. Warns for each listed character that does not
+    contain the entry and each direct container the source left out; a source may list
+    only direct containers. Returns (related, issues, entries changed)."""
+    keys = list(data)
+    order = {char: i for i, char in enumerate(keys)}
+    containers = [[] for _ in keys]
+    for char, direct in direct_components.items():
+        for comp in direct:
+            if comp in order:
+                containers[order[comp]].append(order[char])
+    related, issues, changed = {}, [], 0
+    for char_id, char in enumerate(keys):
+        # closure over the reversed edges walks up through the containers, by (depth, ID)
+        related[char] = derived = [keys[i] for i, _ in closure(containers, char_id) if i != char_id]
+        entry = data[char]
+        source = entry.get("related_characters") if isinstance(entry, dict) else None
+        if source is None:
+            continue
+        listed = distinct_strings(source)
+        if listed == derived:
+            continue
+        changed += 1
+        derived_set, listed_set = set(derived), set(listed)
+        for other in listed:
+            if other not in derived_set:
+                issues.append(issue("related_not_containing", char,
+                                    f"{other} is listed as related to {char} but does not contain {char} at any depth"))
+        for other_id in containers[char_id]:
+            if keys[other_id] not in listed_set:
+                issues.append(issue("containing_not_related", char,
+                                    f"{keys[other_id]} contains {char} but is not listed in the related_characters of {char}"))
+    return related, issues, changed
+
+def validate(data, workers=1, chunk_size=2048):
+    """({char: cleaned meta as JSON}, {char: related_characters}, report) for a parsed map."""
+    started = time.time()
+    metas, direct_components, issues = {}, {}, []
+    normalized = Counter()
+    for char, (meta, entry_issues, entry_normalized, direct) in zip(data, normalized_entries(data, workers, chunk_size)):
+        metas[char] = meta
+        direct_components[char] = direct
+        issues.extend(entry_issues)
+        normalized.update(entry_normalized)
+    related, related_issues, related_changed = rebuild_related(data, direct_components)
+    issues.extend(related_issues)
+    if related_changed:
+        normalized["related_characters"] = related_changed
+    counts = Counter(item["kind"] for item in issues)
+    report = {
+        "entries": len(metas),
+        "workers": workers,
+        "seconds": time.time() - started,
+        "errors": sum(n for kind, n in counts.items() if kind in ERROR_KINDS),
+        "warnings": sum(n for kind, n in counts.items() if kind not in ERROR_KINDS),
+        "counts": dict(sorted(counts.items())),
+        "normalized": dict(sorted(normalized.items())),
+        "issues": issues,
+    }
+    return metas, related, report
+
+def write_json(path, value):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(value, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def write_cleaned(path, metas, related):
+    """Write the cleaned map from the pre-encoded metas, in map order."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("{")
+        for i, (char, meta) in enumerate(metas.items()):
+            f.write(f'{", " if i else ""}{json.dumps(char, ensure_ascii=False)}: {{"meta": {meta}, '
+                    f'"related_characters": {json.dumps(related[char], ensure_ascii=False)}}}')
+        f.write("}")
+    os.replace(tmp_path, path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and normalize the component map JSON.")
+    parser.add_argument("source", nargs="?", default=DATA_FILE)
+    parser.add_argument("-o", "--output", help="cleaned map JSON (default: only write the report)")
+    parser.add_argument("-r", "--report", help="report JSON (default: stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=2048, help="entries per worker task")
+    parser.add_argument("--compile", action="store_true",
+                        help="also compile the cleaned map (-o) into the artifact the app loads without per-field "
+                             "coercion, written next to it; the app finds it when -o is its data file")
+    parser.add_argument("--strict", action="store_true", help="exit with status 1 if any error is found")
+    args = parser.parse_args(argv)
+    if args.compile and not args.output:
+        parser.error("--compile needs -o: the artifact is compiled from the cleaned map and named after it")
+
+    with open(args.source, "rb") as f:
+        raw = f.read()
+    data = json.loads(raw)
+    metas, related, report = validate(data, args.workers, args.chunk_size)
+    report = {"source": args.source, "source_sha256": hashlib.sha256(raw).hexdigest(), "output": args.output, **report}
+    if args.output:
+        write_cleaned(args.output, metas, related)
+        if args.compile:
+            report["artifact"] = compile_artifact(args.output)["output"]
+            if os.path.basename(args.output) != DATA_FILE:
+                print(f"The app opens {artifact_path_for(DATA_FILE)}; rename {args.output} to {DATA_FILE} "
+                      f"and {report['artifact']} to match before deploying", file=sys.stderr)
+    if args.report:
+        write_json(args.report, report)
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    summary = {k: report[k] for k in ("entries", "errors", "warnings", "counts", "seconds")}
+    print(json.dumps(summary, ensure_ascii=False), file=sys.stderr)
+    return 1 if args.strict and report["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())